@@ -0,0 +1,251 @@
+"""
+API Server Module
+Async HTTP service exposing report, news, summary, Q&A and feedback
+
+Run with:
+    uvicorn api_server:app --host 0.0.0.0 --port 8000
+"""
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+import asyncio
+import os
+from dotenv import load_dotenv
+from feedback import aget_feedback_batch
+from llm import get_llm
+import metrics
+import research
+import warmup
+
+load_dotenv()
+
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "32"))
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "120"))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "30"))
+
+
+# Request Schemas
+class TopicRequest(BaseModel):
+    topic: str = Field(min_length=1, description="Research topic")
+    stream: bool = Field(default=False, description="Stream the response as plain text")
+    use_cache: bool = Field(default=True, description="Serve a cached response when available")
+    grounded: bool = Field(default=False, description="Ground news in live web search through MCP")
+
+
+class SummaryRequest(BaseModel):
+    content: str = Field(min_length=1, description="Content to summarize")
+    stream: bool = False
+    use_cache: bool = True
+
+
+class QuestionRequest(BaseModel):
+    question: str = Field(min_length=1, description="Question about the context")
+    context: str = Field(min_length=1, description="Research content to answer from")
+    stream: bool = False
+    use_cache: bool = True
+
+
+class FeedbackRequest(BaseModel):
+    feedback: str = Field(min_length=1, description="User feedback text")
+    rating: Optional[int] = Field(default=None, ge=1, le=5, description="Star rating")
+    use_cache: bool = True
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    Streaming response that frees its concurrency slot once sent
+
+    The body generator releases the slot when it finishes, but it never runs if
+    the client disconnects before the body starts, so the response releases too.
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+
+def default_llm_provider(api_key):
+    """Resolve the caller's client from the shared registry"""
+    return get_llm(api_key, temperature=0.7, max_tokens=2048)
+
+
+def create_app(llm_provider=default_llm_provider, max_concurrency=API_MAX_CONCURRENCY,
+               request_timeout=API_REQUEST_TIMEOUT, queue_timeout=API_QUEUE_TIMEOUT):
+    """
+    Build the API application
+
+    Args:
+        llm_provider (callable): Maps the request's API key (or None) to a chat model;
+            tests can pass a provider returning a local fake
+        max_concurrency (int): Requests allowed to run model calls at once
+        request_timeout (float): Seconds before a model call is abandoned
+        queue_timeout (float): Seconds a request may wait for a concurrency slot
+
+    Returns:
+        FastAPI: Configured application
+    """
+    api = FastAPI(title="AI Research Assistant API")
+    slots = asyncio.Semaphore(max_concurrency)
+
+    def resolve_llm(api_key):
+        try:
+            return llm_provider(api_key)
+        except ValueError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+
+    async def acquire_slot():
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly")
+
+    async def run(task):
+        """Run a task coroutine factory under the concurrency limit and timeout"""
+        await acquire_slot()
+        try:
+            return await asyncio.wait_for(task(None), timeout=request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Model call timed out")
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Model call failed: {str(e)}")
+        finally:
+            slots.release()
+
+    async def stream(task):
+        """Stream a task's output as text deltas under the concurrency limit and timeout"""
+        await acquire_slot()
+        released = False
+
+        def release_once():
+            nonlocal released
+            if not released:
+                released = True
+                slots.release()
+
+        async def deltas():
+            queue = asyncio.Queue()
+            runner = asyncio.ensure_future(task(queue.put_nowait))
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + request_timeout
+            sent = ""
+            try:
+                while True:
+                    getter = asyncio.ensure_future(queue.get())
+                    done, _ = await asyncio.wait(
+                        {getter, runner},
+                        timeout=max(0.0, deadline - loop.time()),
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if getter in done:
+                        text = getter.result()
+                        yield text[len(sent):]
+                        sent = text
+                        continue
+                    getter.cancel()
+                    if runner not in done:
+                        runner.cancel()
+                        yield "\n\n[error: model call timed out]"
+                        return
+                    while not queue.empty():
+                        sent = queue.get_nowait()
+                    try:
+                        final = runner.result()
+                    except Exception as e:
+                        yield f"\n\n[error: {str(e)}]"
+                        return
+                    # Cached responses arrive whole, without streamed chunks
+                    if len(final) > len(sent):
+                        yield final[len(sent):]
+                    return
+            finally:
+                if not runner.done():
+                    runner.cancel()
+                release_once()
+
+        return SlotStreamingResponse(deltas(), release_once, media_type="text/plain; charset=utf-8")
+
+    async def respond(task, streaming, key):
+        if streaming:
+            return await stream(task)
+        return {key: await run(task)}
+
+    @api.get("/health")
+    async def health():
+        return {'status': 'ok'}
+
+    @api.get("/ready")
+    async def ready():
+        """Readiness probe: starts the warm-up on first call and answers 503 until it has finished"""
+        status = warmup.start().status()
+        return JSONResponse(status, status_code=200 if status['state'] == warmup.READY else 503)
+
+    @api.get("/metrics")
+    async def prometheus_metrics():
+        """LLM call latency, TTFT, token, retry and error metrics for Prometheus to scrape"""
+        return PlainTextResponse(metrics.registry.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    @api.post("/report")
+    async def report(request: TopicRequest, x_api_key: Optional[str] = Header(default=None)):
+        llm = resolve_llm(x_api_key)
+        return await respond(
+            lambda on_chunk: research.agenerate_report_content(
+                llm, request.topic, on_chunk, request.use_cache
+            ),
+            request.stream, 'report'
+        )
+
+    @api.post("/news")
+    async def news(request: TopicRequest, x_api_key: Optional[str] = Header(default=None)):
+        llm = resolve_llm(x_api_key)
+        return await respond(
+            lambda on_chunk: research.afetch_news_content(
+                llm, request.topic, on_chunk, request.use_cache, grounded=request.grounded
+            ),
+            request.stream, 'news'
+        )
+
+    @api.post("/summary")
+    async def summary(request: SummaryRequest, x_api_key: Optional[str] = Header(default=None)):
+        llm = resolve_llm(x_api_key)
+        return await respond(
+            lambda on_chunk: research.acreate_summary_content(
+                llm, request.content, on_chunk, request.use_cache
+            ),
+            request.stream, 'summary'
+        )
+
+    @api.post("/qna")
+    async def qna(request: QuestionRequest, x_api_key: Optional[str] = Header(default=None)):
+        llm = resolve_llm(x_api_key)
+        return await respond(
+            lambda on_chunk: research.aanswer_question(
+                llm, request.question, request.context, on_chunk=on_chunk, use_cache=request.use_cache
+            ),
+            request.stream, 'answer'
+        )
+
+    @api.post("/feedback")
+    async def feedback(request: FeedbackRequest, x_api_key: Optional[str] = Header(default=None)):
+        llm = resolve_llm(x_api_key)
+
+        async def task(on_chunk):
+            replies = await aget_feedback_batch(
+                [request.feedback], ratings=[request.rating], use_cache=request.use_cache, llm=llm
+            )
+            return replies[0]
+
+        return await respond(task, False, 'reply')
+
+    return api
+
+
+app = create_app()
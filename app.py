@@ -1,38 +1,49 @@
 import streamlit as st
-import datetime
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import asyncio
+import importlib.util
 from dotenv import load_dotenv
-from feedback import get_feedback
+from llm import get_llm
+from response_cache import get_response_cache
+from tool_cache import get_tool_cache
+from retrieval import content_hash
+from jobs import get_job_runner
+import warmup
 from api_key_manager import get_active_api_key, render_api_key_settings, initialize_api_key_from_storage
+from profiler import RERUN_PROFILE, RerunProfiler
+
+# Rerun profiling: RERUN_PROFILE=1 for every session, or ?profile=1 for one tab
+rerun_profiler = RerunProfiler(RERUN_PROFILE or st.query_params.get("profile") == "1")
+
+def render_rerun_profile():
+    """Show the time spent in each section of this run when rerun profiling is on"""
+    rows = rerun_profiler.record(st.session_state.setdefault('rerun_profile', {}))
+    if rows:
+        with st.expander("⏱️ Rerun profile"):
+            st.dataframe(rows, hide_index=True, use_container_width=True)
 
 load_dotenv()
 
+# Load the research stack in the background, usually while the API key screen is shown;
+# the entered key's chains and the MCP servers are warmed once a key is active
+warmup.start(mcp=False)
+
 # Initialize API key from storage
 initialize_api_key_from_storage()
 
 # Initialize LLM with dynamic API key
-@st.cache_resource
-def get_llm_instance(_api_key):
-    """Get LLM instance with provided API key"""
-    if not _api_key:
+def get_llm_instance(api_key):
+    """Get this user's LLM client from the shared, per-key client registry"""
+    if not api_key:
         raise ValueError("No API key available. Please configure your API key.")
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        api_key=_api_key,
-        temperature=0.7,
-        max_tokens=2048
-    )
+    return get_llm(api_key, temperature=0.7, max_tokens=2048)
 
 # Get active API key and initialize LLM
 active_api_key = get_active_api_key()
 if active_api_key:
     try:
         llm = get_llm_instance(active_api_key)
-        str_parse = StrOutputParser()
         st.session_state['app_ready'] = True
+        warmup.start_for_key(active_api_key)
     except Exception as e:
         llm = None
         st.session_state['app_ready'] = False
@@ -40,6 +51,7 @@ if active_api_key:
 else:
     llm = None
     st.session_state['app_ready'] = False
+rerun_profiler.mark('setup')
 
 # Modern Elegant Professional Theme
 st.markdown("""
@@ -494,6 +506,7 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
+rerun_profiler.mark('theme')
 
 # Streamlit Config
 st.set_page_config(
@@ -603,9 +616,17 @@ if not st.session_state.get('app_ready', False):
         </div>
         """, unsafe_allow_html=True)
     
+    rerun_profiler.mark('welcome')
+    render_rerun_profile()
     st.stop()
 
 # If we reach here, API key is configured - show the main app
+# Imported only now so a cold start can show the API key screen without the LangChain stack
+from feedback import get_feedback
+from rate_limiter import get_rate_limiter
+import metrics
+import research
+
 # Minimalist Sidebar (Reference Design)
 with st.sidebar:
     # Clean Header Section - Centered Text Only
@@ -625,13 +646,37 @@ with st.sidebar:
     # API Key Settings Section
     render_api_key_settings()
     
-    # Divider
-    st.markdown("""
-    <div style='border-top: 1px solid #1a1a1a; margin: 3rem 0;'></div>
-    """, unsafe_allow_html=True)
+    # Generation Preferences
+    st.toggle(
+        "Stream responses",
+        value=True,
+        key="stream_responses",
+        help="Render output as it is generated instead of waiting for the full response"
+    )
+    st.toggle(
+        "Bypass cache",
+        value=False,
+        key="bypass_cache",
+        help="Always call the model and refresh the cached response"
+    )
+    st.toggle(
+        "Run in background",
+        value=True,
+        key="background_jobs",
+        help="Keep generating while you use the rest of the app"
+    )
+    st.toggle(
+        "Ground news in web search",
+        value=importlib.util.find_spec("mcp_use") is not None,
+        key="grounded_news",
+        help="Search the web through MCP and summarize the pages found, instead of relying on the model's memory"
+    )
+    cache_stats_slot = st.empty()
+    admin_metrics_slot = st.empty()
     
-    # Features Section - Simple Text List
+    # Static footer in one element: Divider, Features Section, Divider, Powered By Section
     st.markdown("""
+    <div style='border-top: 1px solid #1a1a1a; margin: 3rem 0;'></div>
     <div style='padding: 0 2rem;'>
         <h3 style='color: #6a6a6a; font-size: 0.75rem; margin: 0 0 2rem 0; 
                    font-weight: 400; letter-spacing: 2px; text-transform: uppercase;'>
@@ -660,15 +705,7 @@ with st.sidebar:
             </p>
         </div>
     </div>
-    """, unsafe_allow_html=True)
-    
-    # Divider
-    st.markdown("""
     <div style='border-top: 1px solid #1a1a1a; margin: 3rem 0;'></div>
-    """, unsafe_allow_html=True)
-    
-    # Powered By Section - Simple Text
-    st.markdown("""
     <div style='padding: 0 2rem;'>
         <h3 style='color: #6a6a6a; font-size: 0.75rem; margin: 0 0 1rem 0; 
                    font-weight: 400; letter-spacing: 2px; text-transform: uppercase;'>
@@ -680,6 +717,7 @@ with st.sidebar:
         </p>
     </div>
     """, unsafe_allow_html=True)
+rerun_profiler.mark('sidebar')
 
 # Initialize Session State
 if 'report' not in st.session_state:
@@ -690,10 +728,18 @@ if 'news' not in st.session_state:
     st.session_state['news'] = ""
 if 'chat_history' not in st.session_state:
     st.session_state['chat_history'] = []
+if 'llm_timings' not in st.session_state:
+    st.session_state['llm_timings'] = {}
+if 'jobs' not in st.session_state:
+    st.session_state['jobs'] = {}
+if 'notices' not in st.session_state:
+    st.session_state['notices'] = []
 
 # Minimal Main Title
-st.markdown("<h1>AI Research Assistant</h1>", unsafe_allow_html=True)
-st.markdown("<p class='subtitle'>Instant research reports, news, and summaries</p>", unsafe_allow_html=True)
+st.markdown(
+    "<h1>AI Research Assistant</h1><p class='subtitle'>Instant research reports, news, and summaries</p>",
+    unsafe_allow_html=True
+)
 
 # Minimal Topic Input
 topic = st.text_input(
@@ -705,150 +751,292 @@ topic = st.text_input(
 
 # Minimal Action Buttons
 st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4 = st.columns(4)
 with col1:
     generate_report = st.button("Generate Report", use_container_width=True)
 with col2:
     generate_news = st.button("Fetch News", use_container_width=True)
 with col3:
     generate_summary = st.button("Create Summary", use_container_width=True)
+with col4:
+    generate_all = st.button("Full Research", use_container_width=True)
+rerun_profiler.mark('inputs')
 
 # Core Functions
-def generate_report_content(topic):
-    """Generate comprehensive research report"""
-    prompt = PromptTemplate(
-        template="""You are an expert research assistant. Create a comprehensive, well-structured research report about: {topic}
-        
-        Structure your report with:
-        
-        ## Introduction
-        Provide a clear, engaging overview of the topic.
-        
-        ## Key Findings
-        List the most important facts, statistics, and insights with specific details.
-        
-        ## Recent Developments
-        Highlight recent news, trends, breakthroughs, and innovations.
-        
-        ## Analysis
-        Provide deeper analysis and context for the findings.
-        
-        ## Conclusion
-        Summarize the main points and their significance for the future.
+def ui_options(placeholder=None):
+    """
+    Wire a research call to this session's placeholder, cache toggle and timings
+    
+    Args:
+        placeholder: Streamlit placeholder to stream partial Markdown into
         
-        Make it informative, well-structured, professional, and easy to read. Use markdown formatting.""",
-        input_variables=['topic']
-    )
-    chain = prompt | llm | str_parse
-    return chain.invoke({'topic': topic})
+    Returns:
+        dict: Keyword options for research task functions
+    """
+    on_chunk = (lambda text: placeholder.markdown(text + " ▌")) if placeholder is not None else None
+    return {
+        'on_chunk': on_chunk,
+        'use_cache': not st.session_state.get('bypass_cache', False),
+        'timings': st.session_state['llm_timings']
+    }
 
-def fetch_news_content(topic):
-    """Fetch latest news and updates"""
-    prompt = PromptTemplate(
-        template="""You are a news aggregator and analyst. Find and summarize the latest news about: {topic}
-        
-        Provide:
-        
-        ## Latest Headlines
-        List 5-7 recent, relevant news headlines with brief context.
-        
-        ## Key Updates
-        Summarize the most important recent developments and their impact.
-        
-        ## Trending Topics
-        Mention what's currently trending, being discussed, or gaining attention.
-        
-        ## Industry Impact
-        Explain how these developments affect the industry or field.
-        
-        Focus on recent, relevant, and credible information. Use markdown formatting.""",
-        input_variables=['topic']
-    )
-    chain = prompt | llm | str_parse
-    return chain.invoke({'topic': topic})
+def render_queue_wait():
+    """Warn when this API key's rate limit will queue the next request"""
+    wait = get_rate_limiter(active_api_key).estimate_wait()
+    if wait >= 1:
+        st.info(f"⏳ Rate limit reached for your API key. Queued, estimated wait: {wait:.0f}s")
 
-def create_summary_content(content):
-    """Create concise summary"""
-    prompt = PromptTemplate(
-        template="""Create a concise, well-organized summary of the following content:
-        
-        {content}
-        
-        Your summary should:
-        - Highlight the main points and key takeaways
-        - Be clear, concise, and easy to understand
-        - Keep only the most important information
-        - Be structured with bullet points or short paragraphs
-        - Be approximately 200-300 words
-        
-        Use markdown formatting for better readability.""",
-        input_variables=['content']
-    )
-    chain = prompt | llm | str_parse
-    return chain.invoke({'content': content})
+def render_timing(task):
+    """Show time-to-first-token and total duration for the last run of a task"""
+    timing = st.session_state['llm_timings'].get(task)
+    if not timing:
+        return
+    if timing.get('cached'):
+        caption = f"⚡ Served from cache in {timing['duration'] * 1000:.0f}ms"
+    elif timing['ttft'] is not None:
+        caption = f"⚡ First token in {timing['ttft']:.2f}s · completed in {timing['duration']:.2f}s"
+    else:
+        caption = f"⚡ Completed in {timing['duration']:.2f}s"
+    deduplicated = timing.get('deduplicated')
+    if deduplicated:
+        caption += (f" · 🧹 {deduplicated['duplicates']} duplicate passages removed "
+                    f"(~{deduplicated['tokens_saved']} tokens saved)")
+    st.caption(caption)
 
-def answer_question(question, context):
-    """Answer questions based on research context"""
-    prompt = PromptTemplate(
-        template="""Based on the following research content, answer the question accurately, concisely, and helpfully.
-        
-        Research Content:
-        {context}
-        
-        Question: {question}
+def get_report_index(report_text):
+    """
+    Get the retrieval index for a report, rebuilding it only when the report changes
+    
+    Args:
+        report_text (str): Report content
         
-        Provide a clear, informative answer. If the information isn't in the research, say so and provide general knowledge if helpful.""",
-        input_variables=['context', 'question']
+    Returns:
+        BM25Index: Index over the report's Markdown chunks
+    """
+    report_hash = content_hash(report_text)
+    cached = st.session_state.get('report_index')
+    if cached and cached['hash'] == report_hash:
+        return cached['index']
+    index = research.build_report_index(report_text)
+    st.session_state['report_index'] = {'hash': report_hash, 'index': index}
+    return index
+
+# Background Jobs
+def report_job(job, llm, topic, use_cache):
+    """Generate and auto-save a report in the background"""
+    text = research.generate_report_content(
+        llm, topic, lambda t: job.update('report', t), use_cache, job.timings
     )
-    chain = prompt | llm | str_parse
-    return chain.invoke({'context': context, 'question': question})
+    return {'report': text, 'saved_to': research.save_report(topic, text)}
+
+def news_job(job, llm, topic, grounded, use_cache):
+    """Fetch news in the background"""
+    return {'news': research.fetch_news_content(
+        llm, topic, lambda t: job.update('news', t), use_cache, job.timings, grounded,
+        on_status=lambda t: job.update('news', t)
+    )}
+
+def summary_job(job, llm, content, use_cache):
+    """Summarize content in the background"""
+    return {'summary': research.create_summary_content(
+        llm, content, lambda t: job.update('summary', t), use_cache, job.timings
+    )}
+
+def full_research_job(job, llm, topic, grounded, use_cache):
+    """Run the concurrent full research bundle in the background"""
+    results = asyncio.run(research.arun_full_research(
+        llm, topic, on_chunk=job.update, use_cache=use_cache, timings=job.timings, grounded=grounded,
+        on_status=job.update
+    ))
+    if isinstance(results.get('report'), str):
+        results['saved_to'] = research.save_report(topic, results['report'])
+    return results
+
+def submit_job(kind, fn, *args):
+    """Queue a background job for this session, replacing any earlier job of the same kind"""
+    job = get_job_runner().submit(kind, fn, llm, *args, not st.session_state.get('bypass_cache', False))
+    st.session_state['jobs'][kind] = job.id
+    st.session_state['notices'].append(('info', f"🚀 Started {kind} job `{job.id}`. You can keep working while it runs."))
+
+def active_job(task):
+    """Return the unfinished job that will produce a task's output, if any"""
+    runner = get_job_runner()
+    for kind in (task, 'full'):
+        job_id = st.session_state['jobs'].get(kind)
+        job = runner.get(job_id) if job_id else None
+        if job and not job.done and (kind == task or task in ('report', 'news', 'summary')):
+            return job
+    return None
+
+def collect_finished_jobs():
+    """Move results of finished background jobs into session state"""
+    runner = get_job_runner()
+    labels = {'report': "Report generated", 'news': "News fetched", 'summary': "Summary created"}
+    for kind, job_id in list(st.session_state['jobs'].items()):
+        job = runner.get(job_id)
+        if job is not None and not job.done:
+            continue
+        del st.session_state['jobs'][kind]
+        if job is None:
+            continue
+        if job.state == 'failed':
+            st.session_state['notices'].append(('error', f"❌ Error running {kind}: {str(job.error)}"))
+            continue
+        st.session_state['llm_timings'].update(job.timings)
+        for task in ('report', 'news', 'summary'):
+            result = job.result.get(task)
+            if isinstance(result, Exception):
+                st.session_state['notices'].append(('error', f"❌ Error running {task}: {str(result)}"))
+            elif result:
+                st.session_state[task] = result
+                st.session_state['notices'].append(('success', f"✅ {labels[task]} successfully!", task))
+        if job.result.get('saved_to'):
+            get_report_index(job.result['report'])
+            st.session_state['notices'].append(('info', f"📁 Report auto-saved to: {job.result['saved_to']}"))
+
+def render_notices():
+    """Show and clear queued status messages"""
+    for notice in st.session_state['notices']:
+        getattr(st, notice[0])(notice[1])
+        if len(notice) > 2:
+            render_timing(notice[2])
+    st.session_state['notices'] = []
+
+def render_job_progress(task):
+    """Poll a running job, showing its partial output until it finishes"""
+    job = active_job(task)
+    if job is None or job.done:
+        st.rerun()
+    st.caption(f"⏳ {job.kind.capitalize()} job `{job.id}` is {job.state}...")
+    partial = job.partial.get(task)
+    if partial:
+        st.markdown(partial + " ▌")
+
+collect_finished_jobs()
+
+# Status messages render above the tabs while results stream into them
+status_area = st.container()
+
+# Minimal Display Results in Tabs
+st.markdown("<div style='margin: 3rem 0 2rem 0; border-top: 1px solid #1a1a1a;'></div>", unsafe_allow_html=True)
+tabs = st.tabs(["Report", "Summary", "News", "Q&A", "Feedback"])
+
+# Output placeholders, one per result tab
+stream_enabled = st.session_state.get('stream_responses', True)
+background = st.session_state.get('background_jobs', True)
+grounded_news = st.session_state.get('grounded_news', False)
+with tabs[0]:
+    report_slot = st.empty()
+with tabs[1]:
+    summary_slot = st.empty()
+with tabs[2]:
+    news_slot = st.empty()
+rerun_profiler.mark('jobs')
 
 # Execute Actions
 if topic:
-    if generate_report:
-        with st.spinner("🔍 Researching and generating comprehensive report..."):
-            try:
-                report_text = generate_report_content(topic)
-                st.session_state['report'] = report_text
-                st.success("✅ Report generated successfully!")
-                
-                # Auto-save report
-                os.makedirs("reports", exist_ok=True)
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                filename = f"reports/report_{topic.replace(' ', '_')}_{timestamp}.md"
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(f"# Research Report: {topic}\n\n{report_text}")
-                st.info(f"📁 Report auto-saved to: {filename}")
-            except Exception as e:
-                st.error(f"❌ Error generating report: {str(e)}")
+    with status_area:
+        if generate_report or generate_news or generate_summary or generate_all:
+            render_queue_wait()
+        
+        if generate_summary and not st.session_state.get('report'):
+            st.warning("⚠️ Please generate a report first before creating a summary!")
+        
+        elif background:
+            if generate_report:
+                submit_job('report', report_job, topic)
+            elif generate_news:
+                submit_job('news', news_job, topic, grounded_news)
+            elif generate_summary:
+                submit_job('summary', summary_job, st.session_state['report'])
+            elif generate_all:
+                submit_job('full', full_research_job, topic, grounded_news)
+        
+        elif generate_report:
+            with st.spinner("🔍 Researching and generating comprehensive report..."):
+                try:
+                    report_text = research.generate_report_content(
+                        llm, topic, **ui_options(report_slot if stream_enabled else None)
+                    )
+                    st.session_state['report'] = report_text
+                    get_report_index(report_text)
+                    st.success("✅ Report generated successfully!")
+                    render_timing('report')
+                    
+                    # Auto-save report
+                    filename = research.save_report(topic, report_text)
+                    st.info(f"📁 Report auto-saved to: {filename}")
+                except Exception as e:
+                    st.error(f"❌ Error generating report: {str(e)}")
 
-    elif generate_news:
-        with st.spinner("📰 Fetching latest news and updates..."):
-            try:
-                news_text = fetch_news_content(topic)
-                st.session_state['news'] = news_text
-                st.success("✅ News fetched successfully!")
-            except Exception as e:
-                st.error(f"❌ Error fetching news: {str(e)}")
+        elif generate_news:
+            with st.spinner("📰 Fetching latest news and updates..."):
+                try:
+                    news_text = research.fetch_news_content(
+                        llm, topic, grounded=grounded_news, on_status=news_slot.markdown,
+                        **ui_options(news_slot if stream_enabled else None)
+                    )
+                    st.session_state['news'] = news_text
+                    st.success("✅ News fetched successfully!")
+                    render_timing('news')
+                except Exception as e:
+                    st.error(f"❌ Error fetching news: {str(e)}")
 
-    elif generate_summary:
-        if st.session_state.get('report'):
+        elif generate_summary:
             with st.spinner("📄 Creating intelligent summary..."):
                 try:
-                    summary = create_summary_content(st.session_state['report'])
+                    summary = research.create_summary_content(
+                        llm, st.session_state['report'], **ui_options(summary_slot if stream_enabled else None)
+                    )
                     st.session_state['summary'] = summary
                     st.success("✅ Summary created successfully!")
+                    render_timing('summary')
                 except Exception as e:
                     st.error(f"❌ Error creating summary: {str(e)}")
-        else:
-            st.warning("⚠️ Please generate a report first before creating a summary!")
 
-# Minimal Display Results in Tabs
-st.markdown("<div style='margin: 3rem 0 2rem 0; border-top: 1px solid #1a1a1a;'></div>", unsafe_allow_html=True)
-tabs = st.tabs(["Report", "Summary", "News", "Q&A", "Feedback"])
+        elif generate_all:
+            slots = {'report': report_slot, 'news': news_slot, 'summary': summary_slot}
+            
+            def stream_to_slot(task, text):
+                slots[task].markdown(text + " ▌")
+            
+            def show_result(task, text):
+                st.session_state[task] = text
+                slots[task].markdown(text)
+            
+            with st.spinner("🚀 Running full research: report, news and summary..."):
+                options = ui_options()
+                results = asyncio.run(research.arun_full_research(
+                    llm, topic,
+                    on_chunk=stream_to_slot if stream_enabled else None,
+                    on_result=show_result,
+                    use_cache=options['use_cache'],
+                    timings=options['timings'],
+                    grounded=grounded_news,
+                    on_status=lambda task, text: slots[task].markdown(text)
+                ))
+            
+            labels = {'report': "Report generated", 'news': "News fetched", 'summary': "Summary created"}
+            for task in ('report', 'news', 'summary'):
+                result = results.get(task)
+                if isinstance(result, Exception):
+                    st.error(f"❌ Error running {task}: {str(result)}")
+                elif result:
+                    st.success(f"✅ {labels[task]} successfully!")
+                    render_timing(task)
+            if isinstance(results.get('report'), str):
+                get_report_index(results['report'])
+                filename = research.save_report(topic, results['report'])
+                st.info(f"📁 Report auto-saved to: {filename}")
 
-with tabs[0]:
-    if st.session_state.get('report'):
+with status_area:
+    render_notices()
+rerun_profiler.mark('actions')
+
+with report_slot.container():
+    if active_job('report'):
+        st.fragment(render_job_progress, run_every=1.0)('report')
+    elif st.session_state.get('report'):
         st.markdown('<div class="content-box report-box">', unsafe_allow_html=True)
         st.markdown(st.session_state['report'])
         st.markdown('</div>', unsafe_allow_html=True)
@@ -863,23 +1051,31 @@ with tabs[0]:
     else:
         st.markdown("<p style='color: #4a4a4a; padding: 2rem 0;'>Click 'Generate Report' to create a research report</p>", unsafe_allow_html=True)
 
-with tabs[1]:
-    if st.session_state.get('summary'):
+with summary_slot.container():
+    if active_job('summary'):
+        st.fragment(render_job_progress, run_every=1.0)('summary')
+    elif st.session_state.get('summary'):
         st.markdown('<div class="content-box summary-box">', unsafe_allow_html=True)
         st.markdown(st.session_state['summary'])
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.markdown("<p style='color: #4a4a4a; padding: 2rem 0;'>Generate a report first, then create a summary</p>", unsafe_allow_html=True)
 
-with tabs[2]:
-    if st.session_state.get('news'):
+with news_slot.container():
+    if active_job('news'):
+        st.fragment(render_job_progress, run_every=1.0)('news')
+    elif st.session_state.get('news'):
         st.markdown('<div class="content-box news-box">', unsafe_allow_html=True)
         st.markdown(st.session_state['news'])
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.markdown("<p style='color: #4a4a4a; padding: 2rem 0;'>Click 'Fetch News' to see the latest updates</p>", unsafe_allow_html=True)
+rerun_profiler.mark('results')
 
-with tabs[3]:
+# Q&A and feedback widgets rerun only their own fragment, not the whole page
+@st.fragment
+def qna_panel():
+    """Q&A tab: questions answered from the report"""
     if st.session_state.get('report'):
         # Q&A Input
         user_question = st.text_input(
@@ -895,9 +1091,19 @@ with tabs[3]:
             clear_button = st.button("Clear", use_container_width=True, key="clear_btn")
         
         if ask_button and user_question:
+            render_queue_wait()
+            answer_slot = st.empty() if stream_enabled else None
             with st.spinner("🤔 Analyzing and formulating answer..."):
                 try:
-                    answer = answer_question(user_question, st.session_state['report'])
+                    answer = research.answer_question(
+                        llm,
+                        user_question,
+                        st.session_state['report'],
+                        get_report_index(st.session_state['report']),
+                        **ui_options(answer_slot)
+                    )
+                    if answer_slot is not None:
+                        answer_slot.empty()
                     st.session_state['chat_history'].append({
                         'question': user_question,
                         'answer': answer
@@ -920,7 +1126,13 @@ with tabs[3]:
     else:
         st.markdown("<p style='color: #4a4a4a; padding: 2rem 0;'>Generate a report first to use Q&A</p>", unsafe_allow_html=True)
 
-with tabs[4]:
+with tabs[3]:
+    qna_panel()
+rerun_profiler.mark('qna')
+
+@st.fragment
+def feedback_panel():
+    """Feedback tab: rating and feedback with an AI reply"""
     col_feedback, col_rating = st.columns([3, 1])
     
     with col_feedback:
@@ -938,7 +1150,12 @@ with tabs[4]:
         if feedback_input:
             try:
                 with st.spinner("Processing..."):
-                    response = get_feedback(feedback_input)
+                    response = get_feedback(
+                        feedback_input,
+                        use_cache=not st.session_state.get('bypass_cache', False),
+                        rating=rating,
+                        api_key=active_api_key
+                    )
                     st.success("Thank you for your feedback")
                     st.markdown(f'<div class="content-box">{response}</div>', unsafe_allow_html=True)
             except Exception as e:
@@ -946,4 +1163,56 @@ with tabs[4]:
         else:
             st.warning("Please enter feedback")
 
+with tabs[4]:
+    feedback_panel()
+rerun_profiler.mark('feedback')
+
+# Cache statistics are filled in last so they include this run's lookups
+cache_stats = get_response_cache().stats()
+cache_caption = (
+    f"💾 Cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+    f"{cache_stats['hit_rate']:.0%} hit rate · {cache_stats['entries']} entries"
+)
+tool_stats = get_tool_cache().stats()
+if tool_stats['tools']:
+    cache_caption += (
+        f"  \n🔧 Tool calls: {tool_stats['hits'] + tool_stats['coalesced']} reused · "
+        f"{tool_stats['misses']} fetched · {tool_stats['hit_rate']:.0%} hit rate"
+    )
+cache_stats_slot.caption(cache_caption)
+
+if metrics.METRICS_ADMIN_PANEL:
+    def _ms(seconds):
+        return f"{seconds * 1000:.0f}" if seconds is not None else "–"
 
+    with admin_metrics_slot.container():
+        with st.expander("📈 LLM metrics"):
+            rows = metrics.registry.summary()
+            if rows:
+                st.dataframe(
+                    [{
+                        'task': row['task'],
+                        'model': row['model'],
+                        'calls': row['calls'],
+                        'p50 ms': _ms(row['p50']),
+                        'p95 ms': _ms(row['p95']),
+                        'p99 ms': _ms(row['p99']),
+                        'TTFT p95 ms': _ms(row['ttft_p95']),
+                        'tokens in/out': f"{row['input_tokens']}/{row['output_tokens']}",
+                        'retries': row['retries'],
+                        'errors': row['errors'],
+                    } for row in rows],
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.caption("No model calls yet")
+            st.download_button(
+                "Prometheus export",
+                metrics.registry.prometheus_text(),
+                file_name="llm_metrics.prom",
+                mime="text/plain",
+                use_container_width=True
+            )
+rerun_profiler.mark('stats')
+render_rerun_profile()
@@ -0,0 +1,114 @@
+"""
+Batch Research CLI
+Generates reports (and optionally news and summaries) for many topics without the Streamlit UI
+
+Usage:
+    python batch_research.py topics.txt --workers 8 --news --summary
+    cat topics.txt | python batch_research.py -
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from llm import get_llm
+from metrics import percentile
+import research
+
+load_dotenv()
+
+
+def read_topics(source):
+    """
+    Read one topic per line, skipping blanks, comments and duplicates
+
+    Args:
+        source (str): File path, or '-' for stdin
+
+    Returns:
+        list: Topics in input order
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    topics = []
+    seen = set()
+    for line in lines:
+        topic = line.strip()
+        if topic and not topic.startswith('#') and topic not in seen:
+            seen.add(topic)
+            topics.append(topic)
+    return topics
+
+
+def research_topic(llm, topic, args):
+    """
+    Generate and save the requested outputs for one topic
+
+    Returns:
+        tuple: (saved file paths, elapsed seconds)
+    """
+    start = time.perf_counter()
+    use_cache = not args.no_cache
+    report_text = research.generate_report_content(llm, topic, use_cache=use_cache)
+    saved = [research.save_report(topic, report_text, args.output_dir)]
+    if args.news:
+        news_text = research.fetch_news_content(llm, topic, use_cache=use_cache, grounded=args.grounded)
+        saved.append(research.save_report(topic, news_text, args.output_dir, kind="news"))
+    if args.summary:
+        summary_text = research.create_summary_content(llm, report_text, use_cache=use_cache)
+        saved.append(research.save_report(topic, summary_text, args.output_dir, kind="summary"))
+    return saved, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate research reports for many topics in parallel")
+    parser.add_argument("topics", help="File with one topic per line, or '-' for stdin")
+    parser.add_argument("--workers", type=int, default=4, help="Topics processed concurrently (default: 4)")
+    parser.add_argument("--output-dir", default="reports", help="Directory for generated files (default: reports)")
+    parser.add_argument("--news", action="store_true", help="Also fetch news for each topic")
+    parser.add_argument("--grounded", action="store_true", help="Ground news in live web search through MCP")
+    parser.add_argument("--summary", action="store_true", help="Also summarize each report")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache")
+    parser.add_argument("--api-key", help="Google Gemini API key (defaults to 'api_key' in .env)")
+    args = parser.parse_args(argv)
+
+    topics = read_topics(args.topics)
+    if not topics:
+        print("No topics to process.", file=sys.stderr)
+        return 1
+
+    llm = get_llm(args.api_key or os.getenv("api_key"), temperature=0.7, max_tokens=2048)
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    print(f"🔍 Researching {len(topics)} topics with {args.workers} workers...")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(research_topic, llm, topic, args): topic for topic in topics}
+        for done, future in enumerate(as_completed(futures), 1):
+            topic = futures[future]
+            try:
+                saved, elapsed = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(topics)}] ❌ {topic}: {str(e)}", file=sys.stderr)
+                continue
+            latencies.append(elapsed)
+            print(f"[{done}/{len(topics)}] ✅ {topic} ({elapsed:.1f}s) → {', '.join(saved)}")
+
+    wall = time.perf_counter() - start
+    print("\n📊 Summary")
+    print(f"   Topics:     {len(latencies)} succeeded, {failures} failed")
+    print(f"   Wall time:  {wall:.1f}s")
+    print(f"   Throughput: {len(latencies) / wall * 60:.1f} topics/min")
+    if latencies:
+        print(f"   Latency:    p50 {percentile(latencies, 50):.1f}s · p95 {percentile(latencies, 95):.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Benchmark CLI
+Measures every flow offline against a deterministic fake LLM and a stub MCP server,
+at several concurrency levels, and fails when a stored baseline regresses
+
+With --cold-start it also times module imports and the first render of the API key screen,
+each in fresh interpreters.
+
+Usage:
+    python benchmark.py --concurrency 1,4,16 --output bench.json
+    python benchmark.py --baseline bench_baseline.json --threshold 0.2
+    python benchmark.py --flows "" --cold-start
+"""
+import os
+
+# Benchmarks run offline and must not read or pollute the real response cache and metrics files
+os.environ.setdefault("RESPONSE_CACHE_PATH", os.path.join(".cache", "benchmark.sqlite3"))
+os.environ.setdefault("METRICS_JSONL_DIR", "")
+os.environ.setdefault("MCP_USE_ANONYMIZED_TELEMETRY", "false")
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import time
+from fake_llm import LatencyProfile, install
+from llm import get_llm
+from metrics import percentile
+import feedback
+import research
+
+FLOWS = ['report', 'news', 'summary', 'qna', 'feedback', 'mcp']
+BENCHMARK_API_KEY = "benchmark-key"
+
+# Cold-start targets: modules timed on import, plus the API key screen's first script run
+COLD_START_MODULES = ['llm', 'research', 'feedback', 'api_server', 'warmup']
+# Changes smaller than this many seconds are interpreter noise, not regressions
+COLD_START_SLACK = 0.05
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+KEY_SCREEN_SCRIPT = """
+import time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120)
+start = time.perf_counter()
+at.run()
+print(time.perf_counter() - start)
+"""
+
+
+def run_stub_mcp_server(tool_latency):
+    """Serve search and fetch_content tools over stdio with a fixed latency"""
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("benchmark", log_level="WARNING")
+
+    @server.tool()
+    async def search(query: str, max_results: int = 5) -> str:
+        await asyncio.sleep(tool_latency)
+        return "\n\n".join(
+            f"{i}. {query} result {i}\n   URL: https://example.com/{i}\n   Summary: Coverage of {query}."
+            for i in range(1, max_results + 1)
+        )
+
+    @server.tool()
+    async def fetch_content(url: str) -> str:
+        await asyncio.sleep(tool_latency)
+        return f"<html><body><p>Article at {url} about recent developments in the field.</p></body></html>"
+
+    server.run()
+
+
+def synthetic_document(index, chars):
+    """Distinct filler paragraphs long enough to take the map-reduce summary path"""
+    rng = random.Random(index)
+    words = "growth market policy model data network adoption study report platform impact trend".split()
+    paragraphs = []
+    while sum(len(p) for p in paragraphs) < chars:
+        paragraphs.append(" ".join(rng.choice(words) for _ in range(80)))
+    return "\n\n".join(f"## Section {i}\n{p}" for i, p in enumerate(paragraphs))
+
+
+class FlowRunner:
+    """Builds one request of each flow; request numbers keep prompts distinct"""
+
+    def __init__(self, llm, args):
+        self.llm = llm
+        self.args = args
+        self.pool = None
+        self.report = "\n\n".join(
+            f"## Section {i}\nFindings about subject {i} and its effect on the industry." for i in range(40)
+        )
+
+    def mcp_pool(self):
+        if self.pool is None:
+            from get_mcp import MCPPool
+            logging.getLogger("mcp_use").setLevel(logging.WARNING)
+            config = {"mcpServers": {"stub": {
+                "command": sys.executable,
+                "args": [os.path.abspath(__file__), "--stub-mcp-server", "--tool-latency", str(self.args.tool_latency)],
+            }}}
+            self.pool = MCPPool(size=self.args.mcp_pool_size, config_factory=lambda: config, llm_factory=lambda: self.llm)
+        return self.pool
+
+    async def run(self, flow, n, on_chunk):
+        topic = f"benchmark topic {n}"
+        if flow == 'report':
+            return await research.agenerate_report_content(self.llm, topic, on_chunk, use_cache=False)
+        if flow == 'news':
+            return await research.afetch_news_content(self.llm, topic, on_chunk, use_cache=False)
+        if flow == 'summary':
+            document = synthetic_document(n, self.args.summary_chars)
+            return await research.acreate_summary_content(self.llm, document, on_chunk, use_cache=False)
+        if flow == 'qna':
+            return await research.aanswer_question(
+                self.llm, f"What about subject {n}?", self.report, on_chunk=on_chunk, use_cache=False
+            )
+        if flow == 'feedback':
+            replies = await feedback.aget_feedback_batch(
+                [f"The report on {topic} was useful but slow"], use_cache=False, fast_path=False,
+                api_key=BENCHMARK_API_KEY
+            )
+            if replies[0] == feedback.FALLBACK_REPLY:
+                raise RuntimeError("feedback call failed")
+            return replies[0]
+        if flow == 'mcp':
+            return await self.mcp_pool().run(f"Find recent news about {topic}")
+        raise ValueError(f"Unknown flow '{flow}'")
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+
+async def measure(runner, flow, concurrency, requests):
+    """
+    Run a flow `requests` times with at most `concurrency` in flight
+
+    Returns:
+        dict: Request and error counts, wall time, throughput and latency/TTFT percentiles
+    """
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    ttfts = []
+    errors = 0
+
+    async def one(n):
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            first = []
+
+            def on_chunk(text):
+                if not first:
+                    first.append(time.perf_counter() - start)
+            try:
+                await runner.run(flow, n, on_chunk)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            ttfts.extend(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(n) for n in range(requests)])
+    wall = time.perf_counter() - start
+
+    def pcts(values):
+        return {f"p{p}": round(percentile(values, p), 4) if values else None for p in (50, 95, 99)}
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'wall_seconds': round(wall, 4),
+        'throughput_rps': round(len(latencies) / wall, 4) if wall else 0.0,
+        'latency': pcts(latencies),
+        'ttft': pcts(ttfts),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Find flows whose p95 latency rose or throughput fell by more than the threshold
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    regressions = []
+    for flow, levels in results.items():
+        for level, current in levels.items():
+            base = baseline.get(flow, {}).get(level)
+            if not base:
+                continue
+            base_p95, current_p95 = base['latency']['p95'], current['latency']['p95']
+            if base_p95 and current_p95 and current_p95 > base_p95 * (1 + threshold):
+                regressions.append(f"{flow} @ {level}: p95 {base_p95:.3f}s → {current_p95:.3f}s")
+            if base['throughput_rps'] and current['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+                regressions.append(
+                    f"{flow} @ {level}: throughput {base['throughput_rps']:.2f} → {current['throughput_rps']:.2f} req/s"
+                )
+            if current['errors'] > base['errors']:
+                regressions.append(f"{flow} @ {level}: errors {base['errors']} → {current['errors']}")
+    return regressions
+
+
+def measure_cold_start(runs):
+    """
+    Time each cold-start target in `runs` fresh interpreters
+
+    Returns:
+        dict: Median and max seconds per target
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    # The app starts a background warm-up; MCP servers would only add noise here
+    env = {**os.environ, 'WARMUP_MCP': '0'}
+    targets = {module: IMPORT_SCRIPT.format(module=module) for module in COLD_START_MODULES}
+    targets['api_key_screen'] = KEY_SCREEN_SCRIPT.format(app=os.path.join(root, "app.py"))
+    results = {}
+    for name, code in targets.items():
+        samples = []
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True
+            )
+            samples.append(float(completed.stdout.split()[-1]))
+        results[name] = {'median': round(statistics.median(samples), 4), 'max': round(max(samples), 4)}
+        print(f"   {name:<15} median {results[name]['median']:.3f}s · max {results[name]['max']:.3f}s")
+    return results
+
+
+def compare_cold_start(results, baseline, threshold):
+    """
+    Find cold-start targets whose median time rose by more than the threshold
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base and current['median'] > base['median'] * (1 + threshold) + COLD_START_SLACK:
+            regressions.append(f"cold start {name}: {base['median']:.3f}s → {current['median']:.3f}s")
+    return regressions
+
+
+async def run_benchmarks(args, flows, levels):
+    runner = FlowRunner(get_llm(BENCHMARK_API_KEY, temperature=0.7, max_tokens=2048), args)
+    results = {}
+    try:
+        for flow in flows:
+            results[flow] = {}
+            # Untimed first requests compile the flow's chains and start every pooled MCP server
+            warmups = args.mcp_pool_size if flow == 'mcp' else 1
+            await asyncio.gather(
+                *[runner.run(flow, f"warmup {i}", lambda text: None) for i in range(warmups)],
+                return_exceptions=True
+            )
+            for concurrency in levels:
+                requests = args.requests or concurrency * 4
+                result = await measure(runner, flow, concurrency, requests)
+                results[flow][str(concurrency)] = result
+                print(f"   {flow:<9} c={concurrency:<3} {result['throughput_rps']:>7.2f} req/s · "
+                      f"p50 {result['latency']['p50'] or 0:.2f}s · p95 {result['latency']['p95'] or 0:.2f}s · "
+                      f"{result['errors']} errors")
+    finally:
+        runner.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every flow against a fake LLM, offline")
+    parser.add_argument("--flows", default=",".join(FLOWS), help=f"Comma-separated flows (default: {','.join(FLOWS)})")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per flow and level (default: 4 x concurrency)")
+    parser.add_argument("--ttft", type=float, default=0.5, help="Median time to first token in seconds (default: 0.5)")
+    parser.add_argument("--ttft-jitter", type=float, default=0.3, help="Log-normal sigma of TTFT (default: 0.3)")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Median generation speed (default: 80)")
+    parser.add_argument("--output-tokens", type=int, default=300, help="Tokens per free-text answer (default: 300)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of attempts that fail (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for every latency and error draw (default: 0)")
+    parser.add_argument("--rate-limit", action="store_true", help="Apply the per-key Gemini rate limiter")
+    parser.add_argument("--summary-chars", type=int, default=20000, help="Document size for the summary flow")
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="Stub MCP tool latency in seconds (default: 0.2)")
+    parser.add_argument("--mcp-pool-size", type=int, default=2, help="MCP agents in the pool (default: 2)")
+    parser.add_argument("--cold-start", action="store_true", help="Also time imports and the API key screen")
+    parser.add_argument("--cold-start-runs", type=int, default=3, help="Fresh interpreters per cold-start target (default: 3)")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file (default: bench_results.json)")
+    parser.add_argument("--baseline", help="Results file to compare against; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression fraction (default: 0.2)")
+    parser.add_argument("--stub-mcp-server", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.stub_mcp_server:
+        run_stub_mcp_server(args.tool_latency)
+        return 0
+
+    flows = [flow.strip() for flow in args.flows.split(",") if flow.strip()]
+    unknown = [flow for flow in flows if flow not in FLOWS]
+    if unknown:
+        print(f"Unknown flows: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if 'mcp' in flows and importlib.util.find_spec("mcp_use") is None:
+        print("⚠️ mcp-use is not installed, skipping the mcp flow", file=sys.stderr)
+        flows.remove('mcp')
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    profile = LatencyProfile(
+        ttft=args.ttft, ttft_jitter=args.ttft_jitter, tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens, error_rate=args.error_rate, seed=args.seed
+    )
+    install(profile, rate_limited=args.rate_limit)
+
+    cold_start = None
+    if args.cold_start:
+        print(f"🧊 Measuring cold start over {args.cold_start_runs} fresh interpreters...")
+        cold_start = measure_cold_start(args.cold_start_runs)
+
+    results = {}
+    if flows:
+        print(f"⏱️ Benchmarking {', '.join(flows)} at concurrency {', '.join(map(str, levels))}...")
+        results = asyncio.run(run_benchmarks(args, flows, levels))
+
+    report = {
+        'profile': profile.to_dict(),
+        'rate_limited': args.rate_limit,
+        'results': results,
+    }
+    if cold_start is not None:
+        report['cold_start'] = cold_start
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get('results', {}), args.threshold)
+        if cold_start is not None:
+            regressions += compare_cold_start(cold_start, baseline.get('cold_start', {}), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+Cassette Module
+Records LLM calls and MCP tool calls with their timing to compact files, and replays them
+offline at recorded speed or as fast as possible
+
+Set CASSETTE_MODE=record to capture traffic and CASSETTE_MODE=replay to serve it back.
+"""
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from typing import Any, Optional
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from tool_cache import make_key as tool_key
+
+# 'off', 'record' or 'replay'
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", os.path.join("cassettes", "session.jsonl.gz"))
+# Replay delay multiplier: 1 keeps recorded timing, 0 replays as fast as possible
+CASSETTE_SPEED = float(os.getenv("CASSETTE_SPEED", "1"))
+
+_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+
+
+class CassetteMissError(LookupError):
+    """A replayed request was never recorded"""
+
+
+def _normalize(text):
+    """Fold whitespace and dates, so a recording still matches on another day"""
+    return " ".join(_DATE.sub("<date>", text).split())
+
+
+def prompt_key(messages):
+    """
+    Hash of a chat request, ignoring whitespace, dates and tool call IDs
+
+    Args:
+        messages (list): LangChain messages sent to the model
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    parts = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        calls = [(call['name'], call['args']) for call in getattr(message, 'tool_calls', None) or []]
+        parts.append([message.type, _normalize(content), calls])
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def run_key(prompt_text, mode):
+    """Hash of an MCP agent run request"""
+    return hashlib.sha256(f"{mode}\n{_normalize(prompt_text)}".encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Append-only store of recorded interactions, one gzipped JSON line each
+
+    Each interaction has a kind ('llm', 'tool' or 'mcp_run') and a request
+    key. Requests recorded more than once are replayed in recorded order.
+    """
+
+    def __init__(self, path=CASSETTE_PATH, mode=CASSETTE_MODE, speed=CASSETTE_SPEED):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._entries = None
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def record(self, entry):
+        """Append one interaction"""
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Each append adds a gzip member; gzip readers see one continuous stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def _load(self):
+        entries = {}
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries.setdefault((entry['kind'], entry['key']), []).append(entry)
+        return entries
+
+    def lookup(self, kind, key):
+        """
+        Next recorded interaction for a request
+
+        Raises:
+            CassetteMissError: The request is not in the cassette
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            matches = self._entries.get((kind, key))
+            if not matches:
+                raise CassetteMissError(f"No recorded {kind} interaction for request {key[:12]} in {self.path}")
+            position = self._positions.get((kind, key), 0)
+            self._positions[(kind, key)] = position + 1
+            return matches[position % len(matches)]
+
+    def delay(self, seconds):
+        return max(0.0, seconds * self.speed)
+
+    # LLM traffic
+    def callbacks(self):
+        """Callback handlers to attach to every LLM client"""
+        return [LLMRecorder(self)] if self.recording else []
+
+    def chat_model_factory(self, factory):
+        """The replay model factory when replaying, otherwise `factory` unchanged"""
+        if not self.replaying:
+            return factory
+
+        def replay_factory(model, temperature=0.7, max_tokens=None, callbacks=None, **kwargs):
+            return ReplayChatModel(model=model, temperature=temperature, max_tokens=max_tokens,
+                                   cassette=self, callbacks=callbacks)
+        return replay_factory
+
+    # MCP traffic
+    async def record_tool(self, name, arguments, call):
+        """Run an MCP tool call and record its result and duration"""
+        start = time.perf_counter()
+        result = await call()
+        content = getattr(result, 'content', None)
+        text = "\n".join(getattr(item, 'text', '') for item in content) if content is not None else str(result)
+        self.record({
+            'kind': 'tool', 'key': tool_key(name, arguments), 'tool': name, 'arguments': arguments,
+            'result': text, 'is_error': bool(getattr(result, 'isError', False)),
+            'duration': round(time.perf_counter() - start, 4),
+        })
+        return result
+
+    async def replay_tool(self, name, arguments):
+        """Recorded text result of an MCP tool call, after its recorded duration"""
+        entry = self.lookup('tool', tool_key(name, arguments))
+        await asyncio.sleep(self.delay(entry['duration']))
+        return entry['result']
+
+    def record_run(self, prompt_text, mode, answer, duration):
+        self.record({
+            'kind': 'mcp_run', 'key': run_key(prompt_text, mode), 'prompt': prompt_text, 'mode': mode,
+            'answer': answer, 'duration': round(duration, 4),
+        })
+
+    async def replay_run(self, prompt_text, mode):
+        """Recorded final answer of an MCP agent run, after its recorded duration"""
+        entry = self.lookup('mcp_run', run_key(prompt_text, mode))
+        await asyncio.sleep(self.delay(entry['duration']))
+        return entry['answer']
+
+
+class LLMRecorder(BaseCallbackHandler):
+    """Records each model call's request, streamed chunks with their offsets, and final output"""
+
+    run_inline = True
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._runs[run_id] = {
+            'start': time.perf_counter(),
+            'key': prompt_key(messages[0]),
+            'request': [[message.type, message.content] for message in messages[0]],
+            'chunks': [],
+        }
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and token:
+            run['chunks'].append([round(time.perf_counter() - run['start'], 4), token])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        generation = response.generations[0][0]
+        message = getattr(generation, 'message', None)
+        self.cassette.record({
+            'kind': 'llm',
+            'key': run['key'],
+            'request': run['request'],
+            'text': generation.text,
+            'tool_calls': [
+                {'name': call['name'], 'args': call['args'], 'id': call.get('id')}
+                for call in getattr(message, 'tool_calls', None) or []
+            ],
+            'usage': dict(getattr(message, 'usage_metadata', None) or {}),
+            'chunks': run['chunks'],
+            'duration': round(time.perf_counter() - run['start'], 4),
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that serves recorded responses, matched by normalized prompt hash"""
+
+    model: str = "replay"
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    cassette: Any = None
+    disable_streaming: Any = "tool_calling"
+
+    @property
+    def _llm_type(self):
+        return "cassette-replay"
+
+    def bind_tools(self, tools, **kwargs):
+        # Recorded responses already contain the tool calls; only their presence matters
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _message(self, entry):
+        return AIMessage(
+            content=entry['text'],
+            tool_calls=[{**call, 'type': 'tool_call'} for call in entry['tool_calls']],
+            usage_metadata=entry['usage'] or None
+        )
+
+    def _chunks(self, entry):
+        """(offset, message chunk) pairs; unstreamed recordings arrive as one chunk at the end"""
+        if entry['tool_calls']:
+            return [[entry['duration'], AIMessageChunk(content=entry['text'], tool_call_chunks=[
+                {'name': call['name'], 'args': json.dumps(call['args']), 'id': call['id'], 'index': i}
+                for i, call in enumerate(entry['tool_calls'])
+            ])]]
+        pairs = entry['chunks'] or [[entry['duration'], entry['text']]]
+        return [[offset, AIMessageChunk(content=text)] for offset, text in pairs]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        entry = self.cassette.lookup('llm', prompt_key(messages))
+        time.sleep(self.cassette.delay(entry['duration']))
+        return ChatResult(generations=[ChatGeneration(message=self._message(entry))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        entry = self.cassette.lookup('llm', prompt_key(messages))
+        await asyncio.sleep(self.cassette.delay(entry['duration']))
+        return ChatResult(generations=[ChatGeneration(message=self._message(entry))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        entry = self.cassette.lookup('llm', prompt_key(messages))
+        start = time.perf_counter()
+        for offset, message in self._chunks(entry):
+            time.sleep(max(0.0, start + self.cassette.delay(offset) - time.perf_counter()))
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                run_manager.on_llm_new_token(message.content, chunk=chunk)
+            yield chunk
+        if entry['usage']:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=entry['usage']))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        entry = self.cassette.lookup('llm', prompt_key(messages))
+        start = time.perf_counter()
+        for offset, message in self._chunks(entry):
+            await asyncio.sleep(max(0.0, start + self.cassette.delay(offset) - time.perf_counter()))
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                await run_manager.on_llm_new_token(message.content, chunk=chunk)
+            yield chunk
+        if entry['usage']:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=entry['usage']))
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Shared cassette configured from CASSETTE_MODE, CASSETTE_PATH and CASSETTE_SPEED"""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette()
+        return _cassette
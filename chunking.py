@@ -0,0 +1,64 @@
+"""
+Text Chunking Module
+Splits Markdown content into size-bounded chunks along section boundaries
+"""
+import re
+
+_HEADING = re.compile(r"^#{1,6}\s", re.MULTILINE)
+
+
+def split_sections(text):
+    """
+    Split Markdown text into sections that each start at a heading
+
+    Args:
+        text (str): Markdown content
+
+    Returns:
+        list: Section strings, including any preamble before the first heading
+    """
+    starts = [m.start() for m in _HEADING.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    sections = [text[bounds[i]:bounds[i + 1]].strip() for i in range(len(starts))]
+    return [section for section in sections if section]
+
+
+def _split_oversized(section, max_chars):
+    """Break a single section on paragraph boundaries, hard-splitting huge paragraphs"""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", section):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if paragraph:
+            pieces.append(paragraph)
+    return pieces
+
+
+def split_markdown(text, max_chars):
+    """
+    Split Markdown into chunks of at most max_chars, packing whole sections together
+
+    Args:
+        text (str): Markdown content
+        max_chars (int): Maximum chunk size in characters
+
+    Returns:
+        list: Chunk strings in document order
+    """
+    chunks = []
+    current = ""
+    for section in split_sections(text):
+        pieces = [section] if len(section) <= max_chars else _split_oversized(section, max_chars)
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,141 @@
+"""
+Deduplication Module
+Near-duplicate detection for source documents using word shingles, MinHash and LSH banding
+"""
+import hashlib
+import os
+import re
+from token_budget import estimate_tokens
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+
+_WORD = re.compile(r"\w+")
+_EMPTY = 1 << 64
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """
+    Hashed word n-grams of a text
+
+    Args:
+        text (str): Document text
+        size (int): Words per shingle
+
+    Returns:
+        set: 64-bit shingle hashes; short texts yield a single shingle of all their words
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    grams = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))]
+    return {int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big") for gram in grams}
+
+
+def minhash(shingle_set):
+    """
+    One-permutation MinHash signature
+
+    Each shingle hash is assigned to one of NUM_PERMUTATIONS bins by its low
+    bits, and the signature keeps the minimum per bin. That is one pass over
+    the shingles instead of one pass per hash function.
+    """
+    signature = [_EMPTY] * NUM_PERMUTATIONS
+    for h in shingle_set:
+        slot = h % NUM_PERMUTATIONS
+        value = h // NUM_PERMUTATIONS
+        if value < signature[slot]:
+            signature[slot] = value
+    return tuple(signature)
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures, ignoring bins empty in both"""
+    used = [(x, y) for x, y in zip(signature_a, signature_b) if x != _EMPTY or y != _EMPTY]
+    if not used:
+        return 0.0
+    return sum(x == y for x, y in used) / len(used)
+
+
+def _bands(signature):
+    """
+    LSH band keys of a signature
+
+    Bands whose bins are all empty are skipped: short documents leave many
+    bins empty, and those bands would put every short document in one bucket.
+    """
+    bands = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        if any(value != _EMPTY for value in rows):
+            bands.append((band, rows))
+    return bands
+
+
+def deduplicate(documents, text=lambda document: document, threshold=DEDUP_THRESHOLD):
+    """
+    Drop near-duplicate documents, keeping the best-ranked copy of each
+
+    Documents are taken to be in rank order. Each one is compared only with
+    the kept documents that share an LSH band with it, so the cost grows
+    linearly with the number of documents.
+
+    Args:
+        documents (list): Documents in rank order (best first)
+        text (callable): Returns a document's text
+        threshold (float): Estimated Jaccard similarity at or above which documents are duplicates
+
+    Returns:
+        tuple: (kept documents, list of (duplicate, kept document it matched), stats dict
+            with documents, duplicates and tokens_saved)
+    """
+    kept = []
+    duplicates = []
+    buckets = {}
+    tokens_saved = 0
+    for document in documents:
+        content = text(document)
+        shingle_set = shingles(content)
+        if not shingle_set:
+            kept.append(document)
+            continue
+        signature = minhash(shingle_set)
+        candidates = {id(match): (match, match_signature)
+                      for key in _bands(signature) for match, match_signature in buckets.get(key, ())}
+        original = next((match for match, match_signature in candidates.values()
+                         if similarity(signature, match_signature) >= threshold), None)
+        if original is not None:
+            duplicates.append((document, original))
+            tokens_saved += estimate_tokens(content)
+            continue
+        kept.append(document)
+        for key in _bands(signature):
+            buckets.setdefault(key, []).append((document, signature))
+    stats = {'documents': len(documents), 'duplicates': len(duplicates), 'tokens_saved': tokens_saved}
+    return kept, duplicates, stats
+
+
+def deduplicate_paragraphs(content, threshold=DEDUP_THRESHOLD, min_words=SHINGLE_WORDS * 4):
+    """
+    Remove repeated paragraphs from a long text, keeping the first occurrence
+
+    Headings and short paragraphs are always kept, since they repeat legitimately.
+
+    Args:
+        content (str): Text with paragraphs separated by blank lines
+        threshold (float): Similarity threshold for duplicates
+        min_words (int): Paragraphs shorter than this are never dropped
+
+    Returns:
+        tuple: (deduplicated text, stats dict as returned by deduplicate)
+    """
+    paragraphs = [p for p in re.split(r"\n\s*\n", content) if p.strip()]
+    candidates = [(i, p) for i, p in enumerate(paragraphs) if len(_WORD.findall(p)) >= min_words]
+    _, duplicates, stats = deduplicate(candidates, text=lambda item: item[1], threshold=threshold)
+    if not duplicates:
+        return content, stats
+    dropped = {i for (i, _), _ in duplicates}
+    return "\n\n".join(p for i, p in enumerate(paragraphs) if i not in dropped), stats
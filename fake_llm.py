@@ -0,0 +1,282 @@
+"""
+Fake LLM Module
+Deterministic stand-in for the Gemini chat model with a configurable latency and error model,
+for benchmarks and load tests that must run offline
+"""
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+from typing import Any, Optional
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from token_budget import estimate_tokens
+import llm as llm_module
+
+# Shortest sleep worth taking between streamed tokens, in seconds
+MIN_SLEEP = 0.002
+
+_WORDS = """
+research analysis market growth model data system industry trend impact adoption policy
+platform performance update report source study result technology framework network
+""".split()
+
+
+class FakeProviderError(Exception):
+    """Injected transient provider failure, retryable like a real 503"""
+
+    status_code = 503
+
+
+class LatencyProfile:
+    """
+    Latency and failure distributions for fake model calls
+
+    Every draw is seeded from the prompt and attempt number, so a run is
+    reproducible regardless of how concurrent calls interleave.
+
+    Args:
+        ttft (float): Median seconds to the first token
+        ttft_jitter (float): Log-normal sigma of the time to first token
+        tokens_per_second (float): Median generation speed
+        speed_jitter (float): Log-normal sigma of the generation speed
+        output_tokens (int): Tokens generated for free-text answers, before the call's output limit
+        error_rate (float): Probability that an attempt fails before its first token
+        seed (int): Base seed for every draw
+    """
+
+    def __init__(self, ttft=0.5, ttft_jitter=0.3, tokens_per_second=80.0, speed_jitter=0.1,
+                 output_tokens=300, error_rate=0.0, seed=0):
+        self.ttft = ttft
+        self.ttft_jitter = ttft_jitter
+        self.tokens_per_second = tokens_per_second
+        self.speed_jitter = speed_jitter
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def rng(self, key, attempt):
+        return random.Random(f"{self.seed}:{key}:{attempt}")
+
+    def draw(self, key, attempt):
+        """
+        Draw the timing and outcome of one call attempt
+
+        Returns:
+            tuple: (seconds to first token, seconds per token, whether the attempt fails)
+        """
+        rng = self.rng(key, attempt)
+        ttft = rng.lognormvariate(math.log(self.ttft), self.ttft_jitter) if self.ttft > 0 else 0.0
+        speed = self.tokens_per_second * rng.lognormvariate(0, self.speed_jitter)
+        return ttft, 1 / speed if speed > 0 else 0.0, rng.random() < self.error_rate
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers from the prompt shape instead of calling a provider
+
+    Free-text prompts get filler markdown, structured-output prompts get valid
+    JSON for their schema (feedback replies, sentiment, MCP tool plans) and
+    tool-calling agents get one tool call followed by an answer.
+    """
+
+    model: str = "fake-gemini"
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    profile: Any = None
+    # Tool-calling turns are answered whole, so agents never see partial tool call chunks
+    disable_streaming: Any = "tool_calling"
+
+    _attempts: dict = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    # Response planning
+    def _prompt_text(self, messages):
+        return "\n".join(str(message.content) for message in messages)
+
+    def _next_attempt(self, key):
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+            return attempt
+
+    def _text(self, rng, tokens):
+        words = ["## Overview\n"]
+        for i in range(max(1, tokens - 2)):
+            words.append(rng.choice(_WORDS) + (".\n\n" if i % 40 == 39 else " "))
+        return "".join(words).strip()
+
+    def _tool_call(self, messages, tools):
+        """One call to the first search-like tool, with its required arguments filled in"""
+        tool = next((t for t in tools if 'search' in t['function']['name']), tools[0])['function']
+        question = next((str(m.content) for m in reversed(messages) if m.type == 'human'), "")[:200]
+        schema = tool.get('parameters', {})
+        args = {}
+        for name in schema.get('required', []):
+            kind = schema.get('properties', {}).get(name, {}).get('type')
+            args[name] = {'integer': 3, 'number': 3, 'boolean': False}.get(kind, question)
+        return AIMessage(content="", tool_calls=[
+            {'name': tool['name'], 'args': args, 'id': f"call_{len(messages)}", 'type': 'tool_call'}
+        ])
+
+    def _respond(self, messages, kwargs):
+        """
+        Decide the reply and its timing for a call
+
+        Returns:
+            tuple: (reply text or tool-call message, input tokens, ttft, seconds per token, fails)
+        """
+        prompt = self._prompt_text(messages)
+        profile = self.profile or LatencyProfile()
+        key = f"{prompt}|{bool(kwargs.get('tools'))}"
+        attempt = self._next_attempt(key)
+        ttft, per_token, fails = profile.draw(key, attempt)
+        rng = profile.rng(key, 'text')
+        limit = kwargs.get('max_output_tokens') or self.max_tokens or profile.output_tokens
+        input_tokens = estimate_tokens(prompt)
+
+        tools = kwargs.get('tools')
+        if tools:
+            if not any(isinstance(m, ToolMessage) for m in messages):
+                return self._tool_call(messages, tools), input_tokens, ttft, per_token, fails
+            return self._text(rng, min(limit, 80)), input_tokens, ttft, per_token, fails
+        if '"calls"' in prompt:
+            calls = []
+            match = re.search(r"^- (\w+)\(([^)]*)\)", prompt, re.MULTILINE)
+            if match and "(none yet)" in prompt:
+                first_arg = match.group(2).split(",")[0].strip()
+                calls.append({'tool': match.group(1), 'arguments': {first_arg: "benchmark query"} if first_arg else {}})
+            return json.dumps({'calls': calls}), input_tokens, ttft, per_token, fails
+        if '"reply"' in prompt:
+            reply = {'sentiment': rng.choice(['positive', 'negative']), 'reply': "Thank you for the feedback."}
+            return json.dumps(reply), input_tokens, ttft, per_token, fails
+        if '"sentiment"' in prompt:
+            return json.dumps({'sentiment': rng.choice(['positive', 'negative'])}), input_tokens, ttft, per_token, fails
+        return self._text(rng, min(limit, profile.output_tokens)), input_tokens, ttft, per_token, fails
+
+    @staticmethod
+    def _usage(input_tokens, reply):
+        output_tokens = estimate_tokens(reply) if isinstance(reply, str) else 20
+        return {'input_tokens': input_tokens, 'output_tokens': output_tokens,
+                'total_tokens': input_tokens + output_tokens}
+
+    def _result(self, reply, input_tokens):
+        usage = self._usage(input_tokens, reply)
+        if isinstance(reply, str):
+            message = AIMessage(content=reply, usage_metadata=usage)
+        else:
+            message = AIMessage(content=reply.content, tool_calls=reply.tool_calls, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _tokens(reply):
+        return re.findall(r"\S+\s*", reply) if isinstance(reply, str) else []
+
+    # Generation
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        reply, input_tokens, ttft, per_token, fails = self._respond(messages, kwargs)
+        time.sleep(ttft)
+        if fails:
+            raise FakeProviderError("503 unavailable: injected failure")
+        time.sleep(per_token * len(self._tokens(reply)))
+        return self._result(reply, input_tokens)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        reply, input_tokens, ttft, per_token, fails = self._respond(messages, kwargs)
+        await asyncio.sleep(ttft)
+        if fails:
+            raise FakeProviderError("503 unavailable: injected failure")
+        await asyncio.sleep(per_token * len(self._tokens(reply)))
+        return self._result(reply, input_tokens)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        reply, input_tokens, ttft, per_token, fails = self._respond(messages, kwargs)
+        time.sleep(ttft)
+        if fails:
+            raise FakeProviderError("503 unavailable: injected failure")
+        start = time.perf_counter()
+        for i, token in enumerate(self._tokens(reply), 1):
+            # Sleep against a schedule so short per-token delays do not accumulate timer overshoot
+            delay = start + i * per_token - time.perf_counter()
+            if delay > MIN_SLEEP:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(input_tokens, reply)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        reply, input_tokens, ttft, per_token, fails = self._respond(messages, kwargs)
+        await asyncio.sleep(ttft)
+        if fails:
+            raise FakeProviderError("503 unavailable: injected failure")
+        start = time.perf_counter()
+        for i, token in enumerate(self._tokens(reply), 1):
+            delay = start + i * per_token - time.perf_counter()
+            if delay > MIN_SLEEP:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(input_tokens, reply)))
+
+
+def fake_factory(profile, rate_limited=False):
+    """
+    Client factory for LLMRegistry that builds FakeChatModel instances
+
+    Args:
+        profile (LatencyProfile): Latency and error model shared by every client
+        rate_limited (bool): Keep the per-key rate limiter, to include quota queuing in measurements
+
+    Returns:
+        callable: Accepts the keyword arguments the registry passes to ChatGoogleGenerativeAI
+    """
+    def factory(model, temperature=0.7, max_tokens=None, rate_limiter=None, callbacks=None, **kwargs):
+        return FakeChatModel(
+            model=model, temperature=temperature, max_tokens=max_tokens, profile=profile,
+            rate_limiter=rate_limiter if rate_limited else None, callbacks=callbacks
+        )
+    return factory
+
+
+def install(profile=None, rate_limited=False):
+    """
+    Route every client from llm.get_llm (and so app.get_llm_instance and
+    feedback.get_gemini_llm) to the fake model
+
+    Args:
+        profile (LatencyProfile): Latency and error model, defaults to LatencyProfile()
+        rate_limited (bool): Keep the per-key rate limiter
+
+    Returns:
+        callable: The previous factory, for uninstall()
+    """
+    previous = llm_module.registry.factory
+    llm_module.registry.factory = fake_factory(profile or LatencyProfile(), rate_limited)
+    llm_module.registry.clear()
+    return previous
+
+
+def uninstall(previous):
+    """Restore the factory returned by install()"""
+    llm_module.registry.factory = previous
+    llm_module.registry.clear()
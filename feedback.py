@@ -4,20 +4,20 @@ Analyzes user feedback sentiment and generates appropriate responses
 """
 from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnableBranch, RunnableLambda
 from pydantic import BaseModel, Field
-from typing import Literal
-from llm import get_llm
+from typing import Literal, Optional
+import hashlib
+import os
+import re
+from llm import get_llm, get_chain
+from response_cache import get_response_cache, make_key
+from rate_limiter import call_with_retry, retrying
+from token_budget import budget_for, estimate_tokens, limit_output, truncate
+from metrics import task_context
 
-# LLM will be initialized lazily when needed
-_gemini_llm = None
-
-def get_gemini_llm():
-    """Lazy initialization of Gemini LLM"""
-    global _gemini_llm
-    if _gemini_llm is None:
-        _gemini_llm = get_llm()
-    return _gemini_llm
+def get_gemini_llm(api_key: Optional[str] = None):
+    """Get the Gemini LLM for an API key from the shared client registry"""
+    return get_llm(api_key)
 
 # Feedback Schema
 class FeedbackSentiment(BaseModel):
@@ -26,8 +26,18 @@ class FeedbackSentiment(BaseModel):
         description="Sentiment classification of the feedback"
     )
 
+class FeedbackReply(BaseModel):
+    """Schema for single-call sentiment classification and reply"""
+    sentiment: Literal['positive', 'negative'] = Field(
+        description="Sentiment classification of the feedback"
+    )
+    reply: str = Field(
+        description="Concise (1-2 sentence) reply to the feedback"
+    )
+
 # Parsers
 pydantic_parse = PydanticOutputParser(pydantic_object=FeedbackSentiment)
+reply_parse = PydanticOutputParser(pydantic_object=FeedbackReply)
 str_parse = StrOutputParser()
 
 # Sentiment Classification Prompt
@@ -62,31 +72,257 @@ negative_prompt = PromptTemplate(
     Keep it concise (1-2 sentences), acknowledge their concerns, and show commitment to improvement."""
 )
 
-def get_feedback(feedback: str) -> str:
+# Single-call Prompt: classification and reply in one structured response
+analyze_prompt = PromptTemplate(
+    template="""Classify the sentiment of the following feedback as either 'positive' or 'negative', then write a reply.
+    
+    Feedback: "{feedback}"
+    
+    If the feedback is positive, write a warm, appreciative, genuine and encouraging thank-you.
+    If the feedback is negative, write a polite, empathetic reply that acknowledges their concerns
+    and shows commitment to improvement.
+    Keep the reply concise (1-2 sentences).
+    
+    {format_instruction}""",
+    input_variables=['feedback'],
+    partial_variables={"format_instruction": reply_parse.get_format_instructions()}
+)
+
+# Local Fast Path: lexicon classifier and template replies for obvious cases
+POSITIVE_WORDS = frozenset("""
+amazing awesome love loved excellent great fantastic helpful perfect wonderful brilliant
+useful impressive good nice best thanks thank superb easy fast accurate
+""".split())
+NEGATIVE_WORDS = frozenset("""
+bad terrible awful hate hated useless slow broken wrong poor worst annoying confusing
+disappointing disappointed inaccurate buggy crash crashed error fails failed
+""".split())
+NEGATIONS = frozenset("not no never don't doesn't didn't isn't wasn't can't cannot hardly".split())
+
+TEMPLATE_REPLIES = {
+    'positive': [
+        "Thank you so much for the kind words! We're thrilled the assistant is helping your research.",
+        "We really appreciate your feedback! It's great to hear the app is working well for you.",
+        "Thanks for the wonderful feedback! We'll keep working to make your research even smoother.",
+    ],
+    'negative': [
+        "We're sorry the experience fell short, and thank you for telling us. We'll use your feedback to improve.",
+        "Thank you for your honest feedback. We hear your concerns and are committed to doing better.",
+        "We apologize for the frustration. Your feedback helps us prioritize the right fixes.",
+    ],
+}
+
+def classify_locally(feedback: str, rating: Optional[int] = None) -> Optional[str]:
+    """
+    Classify clear-cut feedback without calling the LLM
+    
+    Args:
+        feedback (str): User feedback text
+        rating (int): Star rating from 1 to 5, if available
+        
+    Returns:
+        str: 'positive' or 'negative' for obvious cases, None when unsure
+    """
+    if rating is None:
+        return None
+    words = re.findall(r"[a-z']+", feedback.lower())
+    if any(word in NEGATIONS for word in words):
+        return None
+    positive = sum(word in POSITIVE_WORDS for word in words)
+    negative = sum(word in NEGATIVE_WORDS for word in words)
+    if rating >= 4 and positive and not negative:
+        return 'positive'
+    if rating <= 2 and negative and not positive:
+        return 'negative'
+    return None
+
+def template_reply(sentiment: str, feedback: str) -> str:
+    """Pick a canned reply deterministically so the same feedback gets the same answer"""
+    replies = TEMPLATE_REPLIES[sentiment]
+    digest = int(hashlib.sha256(feedback.encode("utf-8")).hexdigest(), 16)
+    return replies[digest % len(replies)]
+
+def build_chains(llm):
+    """
+    Compile the feedback chains for an LLM instance
+    
+    Args:
+        llm: Chat model instance
+        
+    Returns:
+        dict: 'single' structured-output chain and 'two_step' classify-then-reply chain
+    """
+    from langchain_core.runnables import RunnableBranch, RunnableLambda
+    llm = limit_output(llm, 'feedback')
+    classify_chain = classify_prompt | llm | pydantic_parse
+    feedback_chain = RunnableBranch(
+        (lambda x: x.sentiment == "positive", positive_prompt | llm | str_parse),
+        (lambda x: x.sentiment == "negative", negative_prompt | llm | str_parse),
+        RunnableLambda(lambda x: "Thank you for your feedback! We appreciate your input.")
+    )
+    return {
+        'single': analyze_prompt | llm | reply_parse,
+        'two_step': classify_chain | feedback_chain,
+    }
+
+def get_chains(llm):
+    """Get the feedback chains, compiled once per registered LLM client"""
+    return get_chain(llm, 'feedback', build_chains)
+
+FALLBACK_REPLY = "Thank you for your feedback! We appreciate your input and will use it to improve."
+
+# Upper bound on concurrent feedback calls, kept below the provider's rate limit
+FEEDBACK_MAX_CONCURRENCY = int(os.getenv("FEEDBACK_MAX_CONCURRENCY", "8"))
+
+def _templates(single_call: bool) -> list:
+    """Prompt templates that make up the selected pipeline, used for cache keys"""
+    if single_call:
+        return [analyze_prompt.template]
+    return [classify_prompt.template, positive_prompt.template, negative_prompt.template]
+
+def _fit_feedback(feedback: str) -> str:
+    """Truncate feedback so the longest feedback prompt stays within the feedback input budget"""
+    overhead = max(estimate_tokens(prompt.template) for prompt in (analyze_prompt, classify_prompt))
+    return truncate(feedback, budget_for('feedback')['input'] - overhead)
+
+def _prepare_batch(feedbacks, ratings, use_cache, single_call, fast_path, api_key, llm=None):
+    """
+    Resolve fast-path and cached replies, leaving the rest for the LLM
+    
+    Returns:
+        tuple: (results, pending indexes, cache keys, chain, cache)
+    """
+    ratings = ratings if ratings is not None else [None] * len(feedbacks)
+    results = [None] * len(feedbacks)
+    if fast_path:
+        for i, (feedback, rating) in enumerate(zip(feedbacks, ratings)):
+            sentiment = classify_locally(feedback, rating)
+            if sentiment:
+                results[i] = template_reply(sentiment, feedback)
+    
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results, [], {}, None, None
+    
+    llm = llm if llm is not None else get_gemini_llm(api_key)
+    cache = get_response_cache()
+    templates = _templates(single_call)
+    keys = {i: make_key(llm, templates, {'feedback': feedbacks[i]}) for i in pending}
+    if use_cache:
+        for i in pending:
+            results[i] = cache.get(keys[i])
+        pending = [i for i in pending if results[i] is None]
+    chain = get_chains(llm)['single' if single_call else 'two_step']
+    return results, pending, keys, chain, cache
+
+def _finish_batch(results, pending, outputs, keys, cache, single_call):
+    """Store successful replies and substitute the fallback reply for failures"""
+    for i, output in zip(pending, outputs):
+        if isinstance(output, Exception):
+            results[i] = FALLBACK_REPLY
+            continue
+        results[i] = output.reply if single_call else output
+        cache.set(keys[i], 'feedback', results[i])
+    return results
+
+def get_feedback(
+    feedback: str,
+    use_cache: bool = True,
+    rating: Optional[int] = None,
+    single_call: bool = True,
+    fast_path: bool = True,
+    api_key: Optional[str] = None,
+    llm=None
+) -> str:
     """
     Analyze feedback sentiment and generate appropriate response
     
     Args:
         feedback (str): User feedback text
+        use_cache (bool): Serve a previously generated reply when available
+        rating (int): Star rating from 1 to 5, enables the local fast path
+        single_call (bool): Classify and reply in one structured LLM call
+        fast_path (bool): Answer obvious cases locally without calling the LLM
+        api_key (str): User's API key; defaults to secrets or the environment
+        llm: Chat model to use instead of the registry client for api_key
         
     Returns:
         str: AI-generated response based on sentiment
     """
     try:
-        # Get LLM instance lazily
-        llm = get_gemini_llm()
-        
-        # Build chains dynamically
-        classify_chain = classify_prompt | llm | pydantic_parse
-        
-        feedback_chain = RunnableBranch(
-            (lambda x: x.sentiment == "positive", positive_prompt | llm | str_parse),
-            (lambda x: x.sentiment == "negative", negative_prompt | llm | str_parse),
-            RunnableLambda(lambda x: "Thank you for your feedback! We appreciate your input.")
+        feedback = _fit_feedback(feedback)
+        results, pending, keys, chain, cache = _prepare_batch(
+            [feedback], [rating], use_cache, single_call, fast_path, api_key, llm
         )
-        
-        main_chain = classify_chain | feedback_chain
-        result = main_chain.invoke({'feedback': feedback})
-        return result
+        if pending:
+            with task_context('feedback'):
+                outputs = [call_with_retry(chain.invoke, {'feedback': feedback})]
+            _finish_batch(results, pending, outputs, keys, cache, single_call)
+        return results[0]
     except Exception as e:
-        return f"Thank you for your feedback! We appreciate your input and will use it to improve."
+        return FALLBACK_REPLY
+
+def get_feedback_batch(
+    feedbacks: list,
+    max_concurrency: int = 4,
+    ratings: Optional[list] = None,
+    use_cache: bool = True,
+    single_call: bool = True,
+    fast_path: bool = True,
+    api_key: Optional[str] = None,
+    llm=None
+) -> list:
+    """
+    Analyze many pieces of feedback with bounded concurrency
+    
+    Args:
+        feedbacks (list): User feedback texts
+        max_concurrency (int): Maximum LLM calls in flight, capped at FEEDBACK_MAX_CONCURRENCY
+        ratings (list): Optional star ratings aligned with feedbacks
+        use_cache (bool): Serve previously generated replies when available
+        single_call (bool): Classify and reply in one structured LLM call
+        fast_path (bool): Answer obvious cases locally without calling the LLM
+        api_key (str): User's API key; defaults to secrets or the environment
+        llm: Chat model to use instead of the registry client for api_key
+        
+    Returns:
+        list: Responses in input order; failed items get the fallback reply
+    """
+    feedbacks = [_fit_feedback(feedback) for feedback in feedbacks]
+    results, pending, keys, chain, cache = _prepare_batch(
+        feedbacks, ratings, use_cache, single_call, fast_path, api_key, llm
+    )
+    if pending:
+        with task_context('feedback'):
+            outputs = retrying(chain).batch(
+                [{'feedback': feedbacks[i]} for i in pending],
+                config={'max_concurrency': min(max_concurrency, FEEDBACK_MAX_CONCURRENCY)},
+                return_exceptions=True
+            )
+        _finish_batch(results, pending, outputs, keys, cache, single_call)
+    return results
+
+async def aget_feedback_batch(
+    feedbacks: list,
+    max_concurrency: int = 4,
+    ratings: Optional[list] = None,
+    use_cache: bool = True,
+    single_call: bool = True,
+    fast_path: bool = True,
+    api_key: Optional[str] = None,
+    llm=None
+) -> list:
+    """Async counterpart of get_feedback_batch using abatch"""
+    feedbacks = [_fit_feedback(feedback) for feedback in feedbacks]
+    results, pending, keys, chain, cache = _prepare_batch(
+        feedbacks, ratings, use_cache, single_call, fast_path, api_key, llm
+    )
+    if pending:
+        with task_context('feedback'):
+            outputs = await retrying(chain).abatch(
+                [{'feedback': feedbacks[i]} for i in pending],
+                config={'max_concurrency': min(max_concurrency, FEEDBACK_MAX_CONCURRENCY)},
+                return_exceptions=True
+            )
+        _finish_batch(results, pending, outputs, keys, cache, single_call)
+    return results
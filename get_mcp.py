@@ -1,44 +1,490 @@
+"""
+MCP Integration Module
+Lazily created, pooled and pre-warmed MCP agents for web search and scraping,
+with bounded conversation memory per session
+"""
+from collections import OrderedDict
 from mcp_use import MCPAgent,MCPClient
+from mcp_use.client.middleware import Middleware
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
+import asyncio
 import os
-from llm import get_llm
+import threading
+import time
+from llm import get_chain, get_llm
+from rate_limiter import acall_with_retry
+from tool_cache import get_tool_cache
+from token_budget import estimate_tokens, limit_output
+from mcp_planner import plan_and_execute
+from metrics import task_context
+from cassette import get_cassette
 
 
 load_dotenv()
 
-gemin_llm=get_llm()
-
-
-config={
-  "mcpServers": {
-    "duckduckgo-search": {
-        "command": "npx",
-        "args": [
-          "-y",
-          "duckduckgo-mcp-server"
-        ]
-    },
-    "bright_data": {
-        "command": "npx",
-        "args": ["@brightdata/mcp"],
-        "env": {
-            "API_TOKEN": os.getenv("BRIGHT_DATA_API_TOKEN"),
-            "WEB_UNLOCKER_ZONE": os.getenv("WEB_UNLOCKER_ZONE", "unblocker"),
-            "BROWSER_ZONE": os.getenv("BROWSER_ZONE", "scraping_browser")
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_MAX_STEPS = int(os.getenv("MCP_MAX_STEPS", "15"))
+MCP_CHECKOUT_TIMEOUT = float(os.getenv("MCP_CHECKOUT_TIMEOUT", "60"))
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "5"))
+# 'agent' runs the step-by-step MCP agent; 'plan' runs independent tool calls concurrently
+MCP_MODE = os.getenv("MCP_MODE", "agent")
+
+# Per-session memory: recent turns kept verbatim, older turns folded into a summary
+MCP_MEMORY_TURNS = int(os.getenv("MCP_MEMORY_TURNS", "6"))
+MCP_MEMORY_TOKENS = int(os.getenv("MCP_MEMORY_TOKENS", "3000"))
+MCP_MAX_SESSIONS = int(os.getenv("MCP_MAX_SESSIONS", "256"))
+MCP_SESSION_IDLE_SECONDS = float(os.getenv("MCP_SESSION_IDLE_SECONDS", "1800"))
+
+MEMORY_SUMMARY_PROMPT = PromptTemplate(
+    template="""Condense this conversation between a user and a research assistant into a short summary.
+Keep facts, sources, names and open questions the user may refer back to. Drop pleasantries.
+
+Existing summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary (at most 150 words):""",
+    input_variables=['summary', 'turns']
+)
+
+
+def build_memory_summary_chain(llm):
+    return MEMORY_SUMMARY_PROMPT | limit_output(llm, 'mcp_memory') | StrOutputParser()
+
+
+def build_config():
+    """MCP server configuration, read from the environment when first needed"""
+    return {
+      "mcpServers": {
+        "duckduckgo-search": {
+            "command": "npx",
+            "args": [
+              "-y",
+              "duckduckgo-mcp-server"
+            ]
+        },
+        "bright_data": {
+            "command": "npx",
+            "args": ["@brightdata/mcp"],
+            "env": {
+                "API_TOKEN": os.getenv("BRIGHT_DATA_API_TOKEN"),
+                "WEB_UNLOCKER_ZONE": os.getenv("WEB_UNLOCKER_ZONE", "unblocker"),
+                "BROWSER_ZONE": os.getenv("BROWSER_ZONE", "scraping_browser")
+            }
         }
+      }
     }
-  }
-}
 
-client=MCPClient.from_dict(config)
 
-agent=MCPAgent(
-    llm=gemin_llm,
-    client=client,
-    max_steps=15,
-    memory_enabled=True
-)
+class ToolCacheMiddleware(Middleware):
+    """Serve repeated search and scrape calls from the shared tool cache"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or get_tool_cache()
+
+    async def on_call_tool(self, context, call_next):
+        return await self.cache.call(
+            context.params.name,
+            context.params.arguments,
+            lambda: call_next(context),
+            cacheable=lambda result: not getattr(result, 'isError', False)
+        )
+
+
+class CassetteMiddleware(Middleware):
+    """Record each tool call that reaches a server, with its duration, to the cassette"""
+
+    def __init__(self, cassette=None):
+        self.cassette = cassette or get_cassette()
+
+    async def on_call_tool(self, context, call_next):
+        return await self.cassette.record_tool(
+            context.params.name, context.params.arguments, lambda: call_next(context)
+        )
+
+
+def build_middleware():
+    """Tool cache first, so only calls that reach a server are recorded"""
+    middleware = [ToolCacheMiddleware()]
+    if get_cassette().recording:
+        middleware.append(CassetteMiddleware())
+    return middleware
+
+
+class PooledAgent:
+    """One MCP client with its own server processes, and the agent that drives it"""
+
+    def __init__(self, config, llm):
+        self.config = config
+        self.llm = llm
+        self.client = None
+        self.agent = None
+
+    async def start(self):
+        """Spawn the MCP servers and discover their tools; servers are shut down again if this fails"""
+        self.client = MCPClient(config=self.config, middleware=build_middleware())
+        self.agent = MCPAgent(
+            llm=self.llm,
+            client=self.client,
+            max_steps=MCP_MAX_STEPS,
+            # Agents are shared through the pool; history is passed per session
+            memory_enabled=False
+        )
+        try:
+            await self.agent.initialize()
+        except BaseException:
+            await self.close()
+            raise
+
+    async def healthy(self):
+        """Check that every server session is connected and answers a ping"""
+        if self.client is None:
+            return False
+        sessions = self.client.get_all_active_sessions()
+        if not sessions:
+            return False
+        try:
+            for session in sessions.values():
+                if not session.is_connected:
+                    return False
+                await asyncio.wait_for(session.connector.client_session.send_ping(), MCP_PING_TIMEOUT)
+        except Exception:
+            return False
+        return True
+
+    async def close(self):
+        if self.client is not None:
+            try:
+                await self.client.close_all_sessions()
+            except Exception:
+                pass
+        self.client = None
+        self.agent = None
+
+    async def restart(self):
+        await self.close()
+        await self.start()
+
+
+class ConversationMemory:
+    """Recent turns of one session, with older turns rolled into a summary"""
+
+    def __init__(self, max_turns=MCP_MEMORY_TURNS, max_tokens=MCP_MEMORY_TOKENS):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.turns = []
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    def messages(self):
+        """History to send with the next prompt"""
+        messages = []
+        if self.summary:
+            messages.append(HumanMessage(content=f"Summary of our earlier conversation:\n{self.summary}"))
+            messages.append(AIMessage(content="Noted, I will keep that in mind."))
+        for question, answer in self.turns:
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=answer))
+        return messages
+
+    def tokens(self):
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(question) + estimate_tokens(answer) for question, answer in self.turns
+        )
+
+    def add(self, question, answer):
+        self.turns.append((question, str(answer)))
+        self.last_used = time.monotonic()
+
+    def overflow(self):
+        """Remove and return the oldest turns beyond the turn and token limits"""
+        dropped = []
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.tokens() > self.max_tokens):
+            dropped.append(self.turns.pop(0))
+        return dropped
+
+    async def compact(self, summarize):
+        """
+        Fold overflowing turns into the rolling summary
+
+        Args:
+            summarize (callable): Async function (summary, turns) -> new summary
+        """
+        dropped = self.overflow()
+        if not dropped:
+            return
+        try:
+            self.summary = await summarize(self.summary, dropped)
+        except Exception:
+            # Keep the previous summary; the dropped turns are lost rather than resent forever
+            pass
+        # Never let the summary itself grow past half the budget
+        max_chars = self.max_tokens * 2
+        if len(self.summary) > max_chars:
+            self.summary = self.summary[-max_chars:]
+
+
+class SessionStore:
+    """LRU map of session IDs to conversation memory, evicting idle sessions"""
+
+    def __init__(self, max_sessions=MCP_MAX_SESSIONS, idle_seconds=MCP_SESSION_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id, memory = next(iter(self._sessions.items()))
+            if now - memory.last_used <= self.idle_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id):
+        """Get or create the memory for a session"""
+        now = time.monotonic()
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = self._sessions[session_id] = ConversationMemory()
+            self._sessions.move_to_end(session_id)
+            memory.last_used = now
+            self._evict(now)
+            return memory
+
+    def end(self, session_id):
+        """Forget a session's conversation"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class MCPPool:
+    """
+    Pool of warm MCP agents owned by a dedicated event loop thread
+
+    MCP stdio sessions are tied to the loop that created them, so all pool
+    work runs on one background loop and callers on any loop or thread await
+    it through run(). Agents are checked out for the duration of a query, so
+    concurrent queries use separate server processes instead of queueing on
+    a single agent. Agents hold no memory themselves: each session's history
+    is kept in a SessionStore and passed in with the prompt.
+    """
+
+    def __init__(self, size=MCP_POOL_SIZE, config_factory=build_config, llm_factory=get_llm):
+        self.size = size
+        self.config_factory = config_factory
+        self.llm_factory = llm_factory
+        self._loop = None
+        self._thread = None
+        self._idle = None
+        self._members = []
+        self._creating = 0
+        self._next_member = 0
+        self._lock = threading.Lock()
+        self.sessions = SessionStore()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-pool", daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+        return self._loop
+
+    async def _setup(self):
+        self._idle = asyncio.Queue()
+        self._loop.create_task(self._health_loop())
+
+    async def _create_member(self):
+        self._creating += 1
+        try:
+            member = PooledAgent(self.config_factory(), self.llm_factory())
+            await member.start()
+            self._members.append(member)
+            return member
+        finally:
+            self._creating -= 1
+
+    async def _warm_up(self):
+        missing = self.size - len(self._members) - self._creating
+        results = await asyncio.gather(
+            *[self._create_member() for _ in range(max(0, missing))], return_exceptions=True
+        )
+        for member in results:
+            if isinstance(member, PooledAgent):
+                self._idle.put_nowait(member)
+
+    async def _checkout(self):
+        if self._idle.empty() and len(self._members) + self._creating < self.size:
+            return await self._create_member()
+        member = await asyncio.wait_for(self._idle.get(), MCP_CHECKOUT_TIMEOUT)
+        if not await member.healthy():
+            try:
+                await member.restart()
+            except Exception:
+                await member.close()
+                self._members.remove(member)
+                raise
+        return member
+
+    async def _health_loop(self):
+        """Restart idle agents whose server processes have died"""
+        while True:
+            await asyncio.sleep(MCP_HEALTH_INTERVAL)
+            for _ in range(self._idle.qsize()):
+                member = self._idle.get_nowait()
+                try:
+                    if not await member.healthy():
+                        await member.restart()
+                except Exception:
+                    pass
+                self._idle.put_nowait(member)
+
+    async def _run_on_member(self, prompt_text, history, mode):
+        member = await self._checkout()
+        try:
+            if mode == 'plan':
+                try:
+                    return await plan_and_execute(member.llm, member.agent.adapter.tools, prompt_text, history)
+                except OutputParserException:
+                    # The model did not return a usable plan; let the agent work step by step
+                    pass
+            with task_context('mcp_agent'):
+                return await member.agent.run(prompt_text, external_history=history)
+        finally:
+            self._idle.put_nowait(member)
+
+    async def _call_tool(self, name, arguments):
+        # Direct tool calls are short and MCP sessions multiplex requests, so
+        # members are shared round-robin instead of being checked out
+        ready = [member for member in self._members if member.agent is not None]
+        if not ready:
+            # None started or all mid-restart: start or restart one rather than use a dead agent
+            member = await self._checkout()
+            self._idle.put_nowait(member)
+            ready = [member]
+        member = ready[self._next_member % len(ready)]
+        self._next_member += 1
+        tool = next((tool for tool in member.agent.adapter.tools if tool.name == name), None)
+        if tool is None:
+            raise ValueError(f"MCP tool '{name}' is not available")
+        return await tool.ainvoke(arguments)
+
+    async def _summarize(self, summary, turns):
+        llm = self.llm_factory()
+        chain = get_chain(llm, 'mcp_memory_summary', build_memory_summary_chain)
+        text = "\n\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+        with task_context('mcp_memory'):
+            return await acall_with_retry(chain.ainvoke, {'summary': summary or "(none)", 'turns': text})
+
+    async def _compact(self, memory):
+        async with memory.lock:
+            await memory.compact(self._summarize)
+
+    async def _run(self, prompt_text, session_id, mode):
+        if session_id is None:
+            return await self._run_on_member(prompt_text, [], mode)
+        memory = self.sessions.get(session_id)
+        # Turns of one session run in order so each sees the previous answer
+        async with memory.lock:
+            result = await self._run_on_member(prompt_text, memory.messages(), mode)
+            memory.add(prompt_text, result)
+        # Summarize off the response path; the next turn waits on the lock
+        self._loop.create_task(self._compact(memory))
+        return result
+
+    def warm_up(self):
+        """Start the pool's servers in the background without blocking the caller"""
+        if get_cassette().replaying:
+            return
+        asyncio.run_coroutine_threadsafe(self._warm_up(), self._ensure_loop())
+
+    async def run(self, prompt_text, session_id=None, mode=MCP_MODE):
+        """
+        Run a prompt on a checked-out agent
+
+        Args:
+            prompt_text (str): Query for the agent
+            session_id (str): Conversation to continue, or None for a stateless query
+            mode (str): 'agent' for the step-by-step agent, 'plan' to plan independent
+                tool calls and run them concurrently
+
+        Returns:
+            str: Agent's final answer
+        """
+        cassette = get_cassette()
+        if cassette.replaying:
+            return await cassette.replay_run(prompt_text, mode)
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(self._run(prompt_text, session_id, mode), self._ensure_loop())
+        answer = await asyncio.wrap_future(future)
+        if cassette.recording:
+            cassette.record_run(prompt_text, mode, answer, time.perf_counter() - start)
+        return answer
+
+    async def call_tool(self, name, arguments):
+        """
+        Call one MCP tool directly, without the agent
+
+        Args:
+            name (str): Tool name, e.g. 'search'
+            arguments (dict): Tool arguments
+
+        Returns:
+            str: Tool output
+        """
+        cassette = get_cassette()
+        if cassette.replaying:
+            # Served without starting any server, so replays work offline; still
+            # on the pool loop, where the tool cache coalesces in-flight calls
+            call = get_tool_cache().call(name, arguments, lambda: cassette.replay_tool(name, arguments))
+        else:
+            call = self._call_tool(name, arguments)
+        future = asyncio.run_coroutine_threadsafe(call, self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def end_session(self, session_id):
+        """Drop a session's conversation memory"""
+        self.sessions.end(session_id)
+
+    def close(self):
+        """Shut down every agent's servers"""
+        if self._loop is None:
+            return
+        async def close_all():
+            await asyncio.gather(*[member.close() for member in self._members])
+            self._members.clear()
+        asyncio.run_coroutine_threadsafe(close_all(), self._loop).result()
+
+
+# Created on first use so importing this module starts nothing
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Lazy initialization of the process-wide MCP pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MCPPool()
+    return _pool
 
-async def get_mcp_use(prompt_text: str):
-    return await agent.run(prompt_text)
+def warm_up():
+    """Pre-start the MCP pool in the background, e.g. at server start"""
+    get_pool().warm_up()
 
+async def get_mcp_use(prompt_text: str, session_id: str = None, mode: str = MCP_MODE):
+    return await get_pool().run(prompt_text, session_id, mode)
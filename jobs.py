@@ -0,0 +1,116 @@
+"""
+Background Jobs Module
+Thread-pool job runner so generation outlives Streamlit reruns
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+import uuid
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class Job:
+    """A unit of background work with streamed partial output and a final result"""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.state = QUEUED
+        self.partial = {}
+        self.timings = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.state in (SUCCEEDED, FAILED)
+
+    def update(self, task, text):
+        """Record the partial output of a task; safe to call from the worker thread"""
+        self.partial[task] = text
+
+
+class JobRunner:
+    """Runs jobs on a bounded thread pool and keeps finished jobs for a retention period"""
+
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Queue a job
+
+        Args:
+            kind (str): Job type, e.g. 'report' or 'full'
+            fn (callable): Called as fn(job, *args, **kwargs); its return value becomes job.result
+
+        Returns:
+            Job: The queued job
+        """
+        job = Job(kind)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.state = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.state = SUCCEEDED
+        except Exception as e:
+            job.error = e
+            job.state = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        """Forget finished jobs past the retention period; caller holds the lock"""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        Look up a job
+
+        Args:
+            job_id (str): Job identifier
+
+        Returns:
+            Job: The job, or None if unknown or pruned
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+# Process-wide runner shared by every session
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Lazy initialization of the shared job runner"""
+    global _job_runner
+    if _job_runner is None:
+        with _job_runner_lock:
+            if _job_runner is None:
+                _job_runner = JobRunner()
+    return _job_runner
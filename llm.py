@@ -1,32 +1,170 @@
 """
 LLM Configuration Module
-Initializes and provides Google Gemini AI instance
+Initializes and provides Google Gemini AI instances from a shared client registry
+
+The provider SDK, rate limiter, metrics and cassette modules are imported when the first
+client is created, so importing this module stays cheap for screens that need no model.
 """
-from langchain_google_genai import ChatGoogleGenerativeAI
+from collections import OrderedDict
 from dotenv import load_dotenv
+import hashlib
 import os
-import streamlit as st
+import sys
+import threading
+import time
 
 load_dotenv()
 
-def get_llm():
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# Registry bounds: clients beyond the cap or idle past the timeout are evicted
+LLM_REGISTRY_MAX_CLIENTS = int(os.getenv("LLM_REGISTRY_MAX_CLIENTS", "128"))
+LLM_REGISTRY_IDLE_SECONDS = float(os.getenv("LLM_REGISTRY_IDLE_SECONDS", "3600"))
+
+
+def gemini_chat_model(**kwargs):
+    """Create a Gemini chat client, importing langchain_google_genai on first use"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(**kwargs)
+
+
+def default_factory(**kwargs):
+    """Gemini client, or in cassette replay mode a model serving recorded responses"""
+    from cassette import get_cassette
+    return get_cassette().chat_model_factory(gemini_chat_model)(**kwargs)
+
+
+class LLMRegistry:
+    """Process-wide LRU registry of LLM clients keyed by API key hash and model configuration"""
+
+    def __init__(self, max_clients=LLM_REGISTRY_MAX_CLIENTS, idle_seconds=LLM_REGISTRY_IDLE_SECONDS,
+                 factory=default_factory):
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self.factory = factory
+        self._entries = OrderedDict()
+        self._keys_by_client = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(api_key, model, temperature, max_tokens):
+        """Registry key that never holds the raw API key"""
+        key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        return (key_hash, model, temperature, max_tokens)
+
+    def _evict(self, now):
+        """Drop idle clients, then least recently used clients over the cap"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry['last_used'] <= self.idle_seconds and len(self._entries) <= self.max_clients:
+                break
+            self._entries.popitem(last=False)
+            self._keys_by_client.pop(id(entry['llm']), None)
+
+    def get(self, api_key, model=DEFAULT_MODEL, temperature=0.7, max_tokens=None):
+        """
+        Get or create the client for an API key and model configuration
+
+        Args:
+            api_key (str): Google Gemini API key
+            model (str): Model name
+            temperature (float): Sampling temperature
+            max_tokens (int): Output token limit, or None for the model default
+
+        Returns:
+            ChatGoogleGenerativeAI: Shared client instance
+        """
+        key = self.make_key(api_key, model, temperature, max_tokens)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                from rate_limiter import get_rate_limiter
+                from metrics import metrics_handler
+                from cassette import get_cassette
+                limiter = get_rate_limiter(api_key)
+                kwargs = {
+                    'model': model,
+                    'api_key': api_key,
+                    'temperature': temperature,
+                    # Retries are handled by rate_limiter's backoff helpers
+                    'max_retries': 0,
+                    'rate_limiter': limiter,
+                    'callbacks': [limiter.usage_handler, metrics_handler, *get_cassette().callbacks()],
+                }
+                if max_tokens is not None:
+                    kwargs['max_tokens'] = max_tokens
+                entry = {'llm': self.factory(**kwargs), 'chains': {}}
+                self._entries[key] = entry
+                self._keys_by_client[id(entry['llm'])] = key
+            self._entries.move_to_end(key)
+            entry['last_used'] = now
+            self._evict(now)
+            return entry['llm']
+
+    def get_chain(self, llm, name, build):
+        """
+        Get a chain compiled for a registered client, building it on first use
+
+        Args:
+            llm: Client returned by get()
+            name (str): Chain name
+            build (callable): Function that takes the client and returns the chain
+
+        Returns:
+            Compiled chain; unregistered clients get a fresh, uncached build
+        """
+        with self._lock:
+            key = self._keys_by_client.get(id(llm))
+            entry = self._entries.get(key) if key else None
+            if entry is None or entry['llm'] is not llm:
+                return build(llm)
+            chain = entry['chains'].get(name)
+            if chain is None:
+                chain = entry['chains'][name] = build(llm)
+            return chain
+
+    def clear(self):
+        """Remove every client"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_client.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+registry = LLMRegistry()
+
+
+def get_llm(api_key=None, model=DEFAULT_MODEL, temperature=0.7, max_tokens=None):
     """
-    Initialize and return Google Gemini LLM instance
-    
+    Get a Google Gemini LLM instance from the shared registry
+
+    Args:
+        api_key (str): User's API key; falls back to Streamlit secrets (in the app) or the environment
+        model (str): Model name
+        temperature (float): Sampling temperature
+        max_tokens (int): Output token limit, or None for the model default
+
     Returns:
         ChatGoogleGenerativeAI: Configured Gemini AI instance
     """
-    # Try Streamlit secrets first (for deployment), then fall back to env variable
-    try:
-        api_key = st.secrets.get("api_key")
-    except:
+    if not api_key and "streamlit" in sys.modules:
+        # Inside the Streamlit app, try its secrets first (for deployment)
+        try:
+            api_key = sys.modules["streamlit"].secrets.get("api_key")
+        except (FileNotFoundError, KeyError):
+            api_key = None
+    if not api_key:
         api_key = os.getenv("api_key")
-    
+
     if not api_key:
         raise ValueError("API key not found. Please set 'api_key' in your .env file or Streamlit secrets")
-    
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        api_key=api_key,
-        temperature=0.7
-    )
\ No newline at end of file
+
+    return registry.get(api_key, model=model, temperature=temperature, max_tokens=max_tokens)
+
+
+def get_chain(llm, name, build):
+    """Get a chain compiled once per registered client (see LLMRegistry.get_chain)"""
+    return registry.get_chain(llm, name, build)
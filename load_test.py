@@ -0,0 +1,301 @@
+"""
+Load Test CLI
+Simulates concurrent Streamlit sessions against app.py with a stubbed LLM to find how many
+users one process can serve
+
+Each session runs a realistic script headlessly through Streamlit's AppTest:
+enter an API key, generate a report, ask Q&A questions and submit feedback,
+with idle reruns (typing) and think time in between.
+
+Usage:
+    python load_test.py --sessions 1,4,8,16,32 --ttft 0.5 --tokens-per-second 80
+"""
+import os
+
+# Load tests run offline and must not read or pollute the real response cache and metrics files
+os.environ.setdefault("RESPONSE_CACHE_PATH", os.path.join(".cache", "load_test.sqlite3"))
+os.environ.setdefault("METRICS_JSONL_DIR", "")
+os.environ.setdefault("WARMUP_MCP", "0")
+
+import argparse
+import json
+import logging
+import random
+import resource
+import sys
+import threading
+import time
+from fake_llm import LatencyProfile, install
+from metrics import percentile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+MAX_ATTEMPTS = 3
+
+
+def rss_bytes():
+    """Current resident memory of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak rather than current RSS, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def share_server_state():
+    """
+    Make concurrent AppTest sessions share server state like one Streamlit process
+
+    AppTest installs a mock Runtime before each run and clears it afterwards,
+    which breaks runs still in progress on other threads, so the most recent
+    mock is kept. AppTest also compiles the script on every run; a real
+    server compiles it once into a shared script cache, and concurrent
+    compiles can crash the parser, so one cache is shared under a lock.
+    """
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    original_instance = Runtime.instance.__func__
+    latest = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            latest[:] = [cls._instance]
+            return cls._instance
+        if latest:
+            return latest[0]
+        return original_instance(cls)
+
+    Runtime.instance = classmethod(instance)
+
+    original_get_bytecode = ScriptCache.get_bytecode
+    shared_cache = ScriptCache()
+    compile_lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            return original_get_bytecode(shared_cache, script_path)
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def quiet_streamlit():
+    """Silence Streamlit warnings that repeat on every rerun of every session"""
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+
+class Session:
+    """One simulated user driving app.py through AppTest"""
+
+    def __init__(self, index, args):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.args = args
+        self.rng = random.Random(index)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        # Generation runs inside the rerun, so its latency is the user-visible wait
+        self.at.session_state["background_jobs"] = False
+        self.at.session_state["grounded_news"] = False
+        self.reruns = []
+        self.errors = []
+        self.busy = 0.0
+        self.lost = 0
+
+    def rerun(self, step):
+        start = time.perf_counter()
+        try:
+            self.at.run()
+        except Exception as e:
+            self.errors.append(f"{step}: {type(e).__name__}: {str(e)}")
+            return
+        elapsed = time.perf_counter() - start
+        self.busy += elapsed
+        self.reruns.append((step, elapsed))
+        if self.at.exception:
+            self.errors.append(f"{step}: {self.at.exception[0].value}")
+
+    def think(self):
+        time.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+
+    def idle(self):
+        """Reruns with no action, as when the user types into a text box"""
+        for _ in range(self.args.idle_reruns):
+            self.rerun('idle')
+
+    def act(self, step, action, done):
+        """
+        Perform a user action and rerun until its effect shows
+
+        AppTest occasionally drops a widget interaction when runs overlap in
+        threads; such lost interactions are repeated and counted separately
+        from app errors.
+        """
+        for _ in range(MAX_ATTEMPTS):
+            action()
+            self.rerun(step)
+            try:
+                if done():
+                    return
+            except KeyError:
+                pass
+            self.lost += 1
+        raise RuntimeError(f"{step} had no effect after {MAX_ATTEMPTS} attempts")
+
+    def button(self, label):
+        button = next((b for b in self.at.button if b.label == label), None)
+        if button is None:
+            raise LookupError(f"Button '{label}' not found")
+        return button
+
+    def run(self):
+        self.rerun('load')
+        self.think()
+
+        # Enter a key on the welcome screen; each session has its own key and client
+        def enter_key():
+            next(t for t in self.at.text_input if t.label == "Google Gemini API Key").input(
+                "AIza" + f"{self.index:035d}"
+            )
+            self.button("🚀 Start Using the App").click()
+        self.act('enter_key', enter_key, lambda: self.at.session_state['user_api_key'])
+        self.idle()
+        self.think()
+
+        self.at.text_input(key="topic_input").input(f"load test topic {self.index}")
+        self.idle()
+        self.act('report', lambda: self.button("Generate Report").click(),
+                 lambda: self.at.session_state['report'])
+        self.think()
+
+        for question in range(self.args.questions):
+            self.at.text_input(key="qna_input").input(f"What does the report say about point {question}?")
+            self.idle()
+            self.act('qna', lambda: self.at.button(key="ask_btn").click(),
+                     lambda: len(self.at.session_state['chat_history']) > question)
+            self.think()
+
+        self.at.text_area[0].input("Useful report, though it took a while to appear")
+        self.at.slider[0].set_value(3)
+        self.idle()
+        self.act('feedback', lambda: self.at.button(key="feedback_btn").click(),
+                 lambda: any('content-box' in m.value for m in self.at.markdown))
+
+
+def run_level(sessions, args):
+    """
+    Run `sessions` concurrent sessions, starting them over the ramp-up period
+
+    Returns:
+        dict: Rerun latency percentiles per step, errors, script-thread
+            occupancy and memory per session
+    """
+    memory_before = rss_bytes()
+    users = [Session(i, args) for i in range(sessions)]
+    failures = []
+
+    def drive(session):
+        try:
+            session.run()
+        except Exception as e:
+            session.errors.append(f"script: {type(e).__name__}: {str(e)}")
+
+    threads = []
+    start = time.perf_counter()
+    for i, session in enumerate(users):
+        thread = threading.Thread(target=drive, args=(session,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.ramp and i < sessions - 1:
+            time.sleep(args.ramp / sessions)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    memory_after = rss_bytes()
+
+    steps = {}
+    for session in users:
+        for step, elapsed in session.reruns:
+            steps.setdefault(step, []).append(elapsed)
+        failures.extend(session.errors)
+    all_reruns = [elapsed for values in steps.values() for elapsed in values]
+    busy = sum(session.busy for session in users)
+
+    def pcts(values):
+        return {f"p{p}": round(percentile(values, p), 4) for p in (50, 95, 99)}
+
+    return {
+        'sessions': sessions,
+        'completed': sum(1 for session in users if not session.errors),
+        'errors': len(failures),
+        'error_samples': failures[:5],
+        'wall_seconds': round(wall, 3),
+        'reruns': len(all_reruns),
+        'lost_interactions': sum(session.lost for session in users),
+        'rerun_latency': pcts(all_reruns) if all_reruns else None,
+        'steps': {step: {'count': len(values), **pcts(values)} for step, values in sorted(steps.items())},
+        # Average number of script runs executing at once, and each session's busy share
+        'script_threads_busy': round(busy / wall, 3) if wall else 0.0,
+        'occupancy_per_session': round(busy / wall / sessions, 3) if wall else 0.0,
+        'memory_per_session_mb': round(max(0, memory_after - memory_before) / sessions / 2 ** 20, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent headless sessions")
+    parser.add_argument("--sessions", default="1,4,8,16", help="Comma-separated concurrent session counts (default: 1,4,8,16)")
+    parser.add_argument("--questions", type=int, default=3, help="Q&A questions per session (default: 3)")
+    parser.add_argument("--idle-reruns", type=int, default=2, help="Idle reruns before each action (default: 2)")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean seconds between actions (default: 0.5)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which sessions start (default: 2)")
+    parser.add_argument("--ttft", type=float, default=0.5, help="Median time to first token in seconds (default: 0.5)")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Median generation speed (default: 80)")
+    parser.add_argument("--output-tokens", type=int, default=300, help="Tokens per free-text answer (default: 300)")
+    parser.add_argument("--slo", type=float, default=1.0,
+                        help="Idle rerun p95 in seconds above which a level counts as overloaded (default: 1.0)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per rerun (default: 120)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.sessions.split(",")]
+    share_server_state()
+    # Import the app's modules before measuring, so memory per session excludes them
+    Session(0, args).rerun('load')
+    quiet_streamlit()
+    install(LatencyProfile(ttft=args.ttft, tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens))
+
+    print(f"🧪 Load testing app.py with {', '.join(map(str, levels))} concurrent sessions...")
+    results = []
+    breaking_point = None
+    for sessions in levels:
+        result = run_level(sessions, args)
+        results.append(result)
+        idle = result['steps'].get('idle')
+        idle_p95 = idle['p95'] if idle else 0.0
+        print(f"   {sessions:>4} sessions · idle rerun p95 {idle_p95 * 1000:.0f}ms · "
+              f"report p95 {result['steps'].get('report', {}).get('p95', 0):.2f}s · "
+              f"{result['script_threads_busy']:.1f} script threads busy · "
+              f"{result['memory_per_session_mb']:.1f} MB/session · {result['errors']} errors")
+        if result['errors'] or idle_p95 > args.slo:
+            breaking_point = sessions
+            break
+
+    if breaking_point is None:
+        print(f"\n✅ No breaking point up to {levels[-1]} sessions (idle rerun p95 ≤ {args.slo:.2f}s, no errors)")
+    else:
+        print(f"\n⚠️ Breaking point: {breaking_point} sessions")
+        for sample in results[-1]['error_samples']:
+            print(f"   {sample}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({'args': vars(args), 'results': results, 'breaking_point': breaking_point}, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+MCP Planner Module
+Plan-and-execute mode: independent MCP tool calls are planned up front and run concurrently
+"""
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel, Field
+import asyncio
+import os
+from llm import get_chain
+from rate_limiter import acall_with_retry
+from token_budget import budget_for, estimate_tokens, limit_output, truncate
+from metrics import task_context
+
+MCP_PLAN_MAX_ROUNDS = int(os.getenv("MCP_PLAN_MAX_ROUNDS", "2"))
+MCP_PLAN_MAX_CALLS = int(os.getenv("MCP_PLAN_MAX_CALLS", "8"))
+MCP_TOOL_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "4"))
+# Characters of each tool result shown to the planner and the final answer
+MCP_PLAN_RESULT_CHARS = int(os.getenv("MCP_PLAN_RESULT_CHARS", "2000"))
+
+
+# Plan Schema
+class ToolCall(BaseModel):
+    """A single tool invocation"""
+    tool: str = Field(description="Name of the tool to call")
+    arguments: dict = Field(default_factory=dict, description="Arguments for the tool")
+
+
+class ToolPlan(BaseModel):
+    """Tool calls that do not depend on each other's results"""
+    calls: list[ToolCall] = Field(
+        default_factory=list,
+        description="Independent tool calls to run now; empty when the results so far are enough"
+    )
+
+
+plan_parse = PydanticOutputParser(pydantic_object=ToolPlan)
+
+PLAN_PROMPT = PromptTemplate(
+    template="""You are planning web research for a question. Choose tool calls that can all run at the same time:
+none of them may need another one's output. Prefer several focused searches over one broad one, and fetch
+pages whose URLs already appear in the results. Use at most {max_calls} calls. Return no calls once the
+results below are enough to answer.
+
+Available tools:
+{tools}
+
+{history}Question: {question}
+
+Results so far:
+{results}
+
+{format_instruction}""",
+    input_variables=['tools', 'history', 'question', 'results', 'max_calls'],
+    partial_variables={"format_instruction": plan_parse.get_format_instructions()}
+)
+
+ANSWER_PROMPT = PromptTemplate(
+    template="""You are an expert research assistant. Answer the question using the tool results below.
+Cite the URLs you rely on. If the results do not contain the answer, say so.
+
+{history}Question: {question}
+
+Tool results:
+{results}
+
+Answer:""",
+    input_variables=['history', 'question', 'results']
+)
+
+
+def build_plan_chain(llm):
+    return PLAN_PROMPT | limit_output(llm, 'mcp_plan') | plan_parse
+
+
+def build_answer_chain(llm):
+    return ANSWER_PROMPT | limit_output(llm, 'mcp_answer') | StrOutputParser()
+
+
+def describe_tools(tools):
+    """One line per tool with its arguments and a shortened description"""
+    lines = []
+    for tool in tools:
+        description = " ".join((tool.description or "").split())[:200]
+        lines.append(f"- {tool.name}({', '.join(tool.args)}): {description}")
+    return "\n".join(lines)
+
+
+def format_history(messages):
+    """Render earlier conversation turns for a prompt, or an empty string"""
+    if not messages:
+        return ""
+    lines = [f"{'User' if message.type == 'human' else 'Assistant'}: {message.content}" for message in messages]
+    return "Earlier conversation:\n" + "\n".join(lines) + "\n\n"
+
+
+def _fit_results(text, task, prompt, *parts):
+    """Truncate formatted results so the filled prompt stays within the task's input budget"""
+    overhead = estimate_tokens(prompt.template) + sum(estimate_tokens(part) for part in parts)
+    return truncate(text, budget_for(task)['input'] - overhead)
+
+
+def format_results(results):
+    """Number tool results in plan order"""
+    if not results:
+        return "(none yet)"
+    blocks = []
+    for i, (call, output) in enumerate(results, 1):
+        blocks.append(f"[{i}] {call.tool}({call.arguments})\n{output[:MCP_PLAN_RESULT_CHARS]}")
+    return "\n\n".join(blocks)
+
+
+async def execute_calls(tools, calls, max_concurrency=MCP_TOOL_CONCURRENCY):
+    """
+    Run independent tool calls concurrently
+
+    Args:
+        tools (list): LangChain tools exposed by the MCP client
+        calls (list): ToolCall objects
+        max_concurrency (int): Calls allowed in flight at once
+
+    Returns:
+        list: (call, output text) pairs in the same order as calls; failures become error text
+    """
+    by_name = {tool.name: tool for tool in tools}
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def run(call):
+        tool = by_name.get(call.tool)
+        if tool is None:
+            return call, f"Error: unknown tool '{call.tool}'"
+        async with slots:
+            try:
+                return call, str(await tool.ainvoke(call.arguments))
+            except Exception as e:
+                return call, f"Error: {str(e)}"
+
+    return await asyncio.gather(*[run(call) for call in calls])
+
+
+async def plan_and_execute(llm, tools, question, history=None, max_rounds=MCP_PLAN_MAX_ROUNDS,
+                           max_calls=MCP_PLAN_MAX_CALLS, max_concurrency=MCP_TOOL_CONCURRENCY):
+    """
+    Answer a question by planning rounds of independent tool calls, running each round concurrently
+
+    A typical query takes two rounds (searches, then fetches of the URLs found)
+    instead of one agent step per tool call.
+
+    Args:
+        llm: Chat model for planning and answering
+        tools (list): LangChain tools exposed by the MCP client
+        question (str): User's question
+        history (list): Earlier conversation messages, if any
+        max_rounds (int): Planning rounds before answering
+        max_calls (int): Tool calls allowed per round
+        max_concurrency (int): Tool calls in flight at once
+
+    Returns:
+        str: Final answer
+    """
+    plan_chain = get_chain(llm, 'mcp_plan', build_plan_chain)
+    answer_chain = get_chain(llm, 'mcp_answer', build_answer_chain)
+    history_text = format_history(history)
+    tools_text = describe_tools(tools)
+    results = []
+    seen = set()
+
+    for _ in range(max_rounds):
+        with task_context('mcp_plan'):
+            plan = await acall_with_retry(plan_chain.ainvoke, {
+                'tools': tools_text,
+                'history': history_text,
+                'question': question,
+                'results': _fit_results(
+                    format_results(results), 'mcp_plan', PLAN_PROMPT, tools_text, history_text, question
+                ),
+                'max_calls': max_calls,
+            })
+        calls = []
+        for call in plan.calls:
+            signature = (call.tool, repr(sorted(call.arguments.items())))
+            if signature not in seen:
+                seen.add(signature)
+                calls.append(call)
+        calls = calls[:max_calls]
+        if not calls:
+            break
+        results.extend(await execute_calls(tools, calls, max_concurrency))
+
+    with task_context('mcp_answer'):
+        return await acall_with_retry(answer_chain.ainvoke, {
+            'history': history_text,
+            'question': question,
+            'results': _fit_results(format_results(results), 'mcp_answer', ANSWER_PROMPT, history_text, question),
+        })
@@ -0,0 +1,297 @@
+"""
+Metrics Module
+Per-task LLM call instrumentation: latency and TTFT histograms, tokens, retries and errors,
+exported as Prometheus text and rolling JSONL files
+"""
+from collections import deque
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+
+METRICS_JSONL_DIR = os.getenv("METRICS_JSONL_DIR", ".metrics")
+METRICS_JSONL_RETENTION_DAYS = int(os.getenv("METRICS_JSONL_RETENTION_DAYS", "7"))
+# Recent calls kept per task and model for exact percentiles
+METRICS_SAMPLE_SIZE = int(os.getenv("METRICS_SAMPLE_SIZE", "1000"))
+# Show the p50/p95/p99 panel in the app sidebar
+METRICS_ADMIN_PANEL = bool(int(os.getenv("METRICS_ADMIN_PANEL", "0")))
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_current_task = contextvars.ContextVar("llm_task", default="other")
+
+
+@contextmanager
+def task_context(task):
+    """Attribute LLM calls made inside the block (including async tasks it starts) to a task"""
+    token = _current_task.set(task)
+    try:
+        yield
+    finally:
+        _current_task.reset(token)
+
+
+def current_task():
+    return _current_task.get()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Integer ceiling of pct * n / 100; float division misplaces ranks such as p7 of 100
+    rank = -(-pct * len(ordered) // 100)
+    return ordered[min(max(int(rank) - 1, 0), len(ordered) - 1)]
+
+
+class _Series:
+    """Histogram, counters and recent samples for one task and model"""
+
+    def __init__(self):
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.ttft_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.ttft_sum = 0.0
+        self.ttft_count = 0
+        self.calls = 0
+        self.errors = {}
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=METRICS_SAMPLE_SIZE)
+        self.ttfts = deque(maxlen=METRICS_SAMPLE_SIZE)
+
+    @staticmethod
+    def _observe(buckets, value):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of LLM call metrics keyed by (task, model)"""
+
+    def __init__(self, jsonl_dir=METRICS_JSONL_DIR, retention_days=METRICS_JSONL_RETENTION_DAYS):
+        self.jsonl_dir = jsonl_dir
+        self.retention_days = retention_days
+        self._series = {}
+        self._last_model = {}
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._file_date = None
+
+    def _get(self, task, model):
+        key = (task, model or "unknown")
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        return series
+
+    def record_call(self, task, model, latency, ttft=None, input_tokens=0, output_tokens=0, error=None):
+        """
+        Record one finished LLM call
+
+        Args:
+            task (str): Task the call belongs to
+            model (str): Model name
+            latency (float): Seconds from request to last token or error
+            ttft (float): Seconds to the first streamed token, if streamed
+            input_tokens (int): Prompt tokens reported by the provider
+            output_tokens (int): Completion tokens reported by the provider
+            error (str): Exception type name if the call failed
+        """
+        with self._lock:
+            series = self._get(task, model)
+            self._last_model[task] = model
+            series.calls += 1
+            series.latency_sum += latency
+            series.latencies.append(latency)
+            _Series._observe(series.latency_buckets, latency)
+            if ttft is not None:
+                series.ttft_sum += ttft
+                series.ttft_count += 1
+                series.ttfts.append(ttft)
+                _Series._observe(series.ttft_buckets, ttft)
+            series.input_tokens += input_tokens
+            series.output_tokens += output_tokens
+            if error:
+                series.errors[error] = series.errors.get(error, 0) + 1
+        self._append_jsonl({
+            'ts': time.time(), 'task': task, 'model': model, 'latency': round(latency, 4),
+            'ttft': round(ttft, 4) if ttft is not None else None,
+            'input_tokens': input_tokens, 'output_tokens': output_tokens, 'error': error,
+        })
+
+    def record_retry(self, task, model=None):
+        """Count a retried call, against the task's most recently used model when none is given"""
+        with self._lock:
+            model = model or self._last_model.get(task)
+            self._get(task, model).retries += 1
+        self._append_jsonl({'ts': time.time(), 'task': task, 'model': model, 'retry': True})
+
+    def _append_jsonl(self, record):
+        """Append a record to today's file, pruning files past the retention period on rollover"""
+        if not self.jsonl_dir:
+            return
+        today = datetime.date.today()
+        try:
+            with self._file_lock:
+                if self._file_date != today:
+                    os.makedirs(self.jsonl_dir, exist_ok=True)
+                    self._prune(today)
+                    self._file_date = today
+                path = os.path.join(self.jsonl_dir, f"llm-calls-{today.strftime('%Y%m%d')}.jsonl")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError:
+            # Metrics must never break a user request
+            pass
+
+    def _prune(self, today):
+        cutoff = (today - datetime.timedelta(days=self.retention_days)).strftime('%Y%m%d')
+        for name in os.listdir(self.jsonl_dir):
+            if name.startswith("llm-calls-") and name.endswith(".jsonl") and name[10:18] < cutoff:
+                os.remove(os.path.join(self.jsonl_dir, name))
+
+    def summary(self):
+        """
+        Percentiles and totals per task and model
+
+        Returns:
+            list: Dicts with task, model, calls, errors, retries, tokens and
+                p50/p95/p99 latency and TTFT in seconds, sorted by task
+        """
+        with self._lock:
+            rows = []
+            for (task, model), series in sorted(self._series.items()):
+                latencies = list(series.latencies)
+                ttfts = list(series.ttfts)
+                rows.append({
+                    'task': task,
+                    'model': model,
+                    'calls': series.calls,
+                    'errors': sum(series.errors.values()),
+                    'retries': series.retries,
+                    'input_tokens': series.input_tokens,
+                    'output_tokens': series.output_tokens,
+                    'p50': percentile(latencies, 50),
+                    'p95': percentile(latencies, 95),
+                    'p99': percentile(latencies, 99),
+                    'ttft_p50': percentile(ttfts, 50),
+                    'ttft_p95': percentile(ttfts, 95),
+                    'ttft_p99': percentile(ttfts, 99),
+                })
+            return rows
+
+    def prometheus_text(self):
+        """Render every series in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram(name, help_text, pick):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (task, model), series in sorted(self._series.items()):
+                buckets, total, count = pick(series)
+                labels = f'task="{task}",model="{model}"'
+                for bound, value in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {value}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{name}_sum{{{labels}}} {total:.6f}')
+                lines.append(f'{name}_count{{{labels}}} {count}')
+
+        def counter(name, help_text, pick):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (task, model), series in sorted(self._series.items()):
+                lines.append(f'{name}{{task="{task}",model="{model}"}} {pick(series)}')
+
+        with self._lock:
+            histogram("llm_request_duration_seconds", "LLM call latency",
+                      lambda s: (s.latency_buckets, s.latency_sum, s.calls))
+            histogram("llm_time_to_first_token_seconds", "Time to first streamed token",
+                      lambda s: (s.ttft_buckets, s.ttft_sum, s.ttft_count))
+            counter("llm_input_tokens_total", "Prompt tokens", lambda s: s.input_tokens)
+            counter("llm_output_tokens_total", "Completion tokens", lambda s: s.output_tokens)
+            counter("llm_retries_total", "Retried calls", lambda s: s.retries)
+            lines.append("# HELP llm_errors_total Failed calls by error type")
+            lines.append("# TYPE llm_errors_total counter")
+            for (task, model), series in sorted(self._series.items()):
+                for error, count in sorted(series.errors.items()):
+                    lines.append(f'llm_errors_total{{task="{task}",model="{model}",error="{error}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = MetricsRegistry()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times every model call and records it under the task set by task_context()"""
+
+    # Cheap and thread-safe, so run in the caller's thread where the task context is visible
+    run_inline = True
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or registry
+        self._runs = {}
+
+    def _start(self, run_id, metadata, kwargs):
+        model = ((metadata or {}).get('ls_model_name')
+                 or (kwargs.get('invocation_params') or {}).get('model')
+                 or (kwargs.get('invocation_params') or {}).get('model_name'))
+        self._runs[run_id] = {'start': time.perf_counter(), 'first': None,
+                              'task': current_task(), 'model': model}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run['first'] is None:
+            run['first'] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if usage:
+                    input_tokens += usage.get('input_tokens', 0)
+                    output_tokens += usage.get('output_tokens', 0)
+        now = time.perf_counter()
+        self.metrics.record_call(
+            run['task'], run['model'], now - run['start'],
+            ttft=(run['first'] - run['start']) if run['first'] else None,
+            input_tokens=input_tokens, output_tokens=output_tokens
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        self.metrics.record_call(
+            run['task'], run['model'], time.perf_counter() - run['start'], error=type(error).__name__
+        )
+
+
+metrics_handler = MetricsCallbackHandler()
+
+
+def record_retry():
+    """Count a retry against the current task; called by the retry helpers"""
+    registry.record_retry(current_task())
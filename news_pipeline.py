@@ -0,0 +1,311 @@
+"""
+News Pipeline Module
+Grounds news in live web results: MCP search, concurrent polite page fetching, text extraction, LLM digest
+"""
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+import asyncio
+import datetime
+import os
+import re
+import time
+from tool_cache import normalize_url
+from dedup import deduplicate
+from token_budget import budget_for, estimate_tokens, limit_output, pack, truncate
+from llm import get_chain
+import research
+
+# Search and fetch settings
+NEWS_SEARCH_RESULTS = int(os.getenv("NEWS_SEARCH_RESULTS", "8"))
+NEWS_MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", "5"))
+NEWS_FETCH_CONCURRENCY = int(os.getenv("NEWS_FETCH_CONCURRENCY", "6"))
+NEWS_PER_DOMAIN_CONCURRENCY = int(os.getenv("NEWS_PER_DOMAIN_CONCURRENCY", "2"))
+NEWS_FETCH_TIMEOUT = float(os.getenv("NEWS_FETCH_TIMEOUT", "10"))
+# Seconds to wait for fetches overall before summarizing whatever has arrived
+NEWS_FETCH_DEADLINE = float(os.getenv("NEWS_FETCH_DEADLINE", "15"))
+NEWS_ARTICLE_CHARS = int(os.getenv("NEWS_ARTICLE_CHARS", "3000"))
+
+GROUNDED_NEWS_PROMPT = PromptTemplate(
+    template="""You are a news aggregator and analyst. Today is {date}. Summarize the latest news about: {topic}
+
+    Use only the numbered articles below, and cite them inline as [1], [2], etc.
+
+    {articles}
+
+    Provide:
+
+    ## Latest Headlines
+    List the most relevant recent headlines from the articles with brief context.
+
+    ## Key Updates
+    Summarize the most important recent developments and their impact.
+
+    ## Trending Topics
+    Mention what is currently being discussed or gaining attention.
+
+    ## Industry Impact
+    Explain how these developments affect the industry or field.
+
+    If the articles say little about the topic, say so rather than filling gaps from memory. Use markdown formatting.""",
+    input_variables=['date', 'topic', 'articles']
+)
+
+
+class NewsSearchError(Exception):
+    """Web search was unavailable or returned nothing usable"""
+
+
+def build_grounded_news_chain(llm):
+    return GROUNDED_NEWS_PROMPT | limit_output(llm, 'news') | StrOutputParser()
+
+
+# Search results as formatted by duckduckgo-mcp-server:
+#   1. Title
+#      URL: https://...
+#      Summary: ...
+RESULT_PATTERN = re.compile(
+    r'^\s*\d+\.\s*(?P<title>.+?)\s*\n\s*URL:\s*(?P<url>\S+)(?:\s*\n\s*Summary:\s*(?P<snippet>.*))?',
+    re.MULTILINE
+)
+URL_PATTERN = re.compile(r'https?://[^\s<>()"\']+')
+
+
+def parse_search_results(text):
+    """
+    Extract results from search tool output, dropping duplicate URLs
+
+    Args:
+        text (str): Search tool output
+
+    Returns:
+        list: Dicts with title, url and snippet, in rank order
+    """
+    results = [
+        {'title': m.group('title'), 'url': m.group('url'), 'snippet': (m.group('snippet') or "").strip()}
+        for m in RESULT_PATTERN.finditer(text)
+    ]
+    if not results:
+        # Unknown format: fall back to bare URLs
+        results = [{'title': url, 'url': url, 'snippet': ""} for url in URL_PATTERN.findall(text)]
+    unique = []
+    seen = set()
+    for result in results:
+        key = normalize_url(result['url'])
+        if result['url'].startswith(('http://', 'https://')) and key not in seen:
+            seen.add(key)
+            unique.append(result)
+    return unique
+
+
+class _TextExtractor(HTMLParser):
+    """Collect visible text, skipping scripts, styles and page chrome"""
+
+    SKIP = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg'}
+
+    def __init__(self):
+        super().__init__()
+        self.depth = 0
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.depth += 1
+        elif tag in ('p', 'br', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'article', 'section'):
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self.depth:
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if not self.depth:
+            self.parts.append(data)
+
+
+def extract_main_text(content, max_chars=NEWS_ARTICLE_CHARS):
+    """
+    Reduce a fetched page to its main prose
+
+    Args:
+        content (str): Page HTML or text as returned by the fetch tool
+        max_chars (int): Length cap
+
+    Returns:
+        str: Paragraph-like lines, without menus, boilerplate or repeats
+    """
+    if re.search(r'<(html|body|p|div)\b', content, re.IGNORECASE):
+        extractor = _TextExtractor()
+        extractor.feed(content)
+        content = "".join(extractor.parts)
+    lines = []
+    seen = set()
+    for line in content.splitlines():
+        line = " ".join(line.split())
+        # Short lines are mostly navigation, buttons and captions
+        if len(line) < 40 or line in seen:
+            continue
+        seen.add(line)
+        lines.append(line)
+    return "\n".join(lines)[:max_chars]
+
+
+class PoliteFetcher:
+    """Fetches pages with a global concurrency cap, a per-domain cap and a per-page timeout"""
+
+    def __init__(self, call_tool, concurrency=NEWS_FETCH_CONCURRENCY,
+                 per_domain=NEWS_PER_DOMAIN_CONCURRENCY, timeout=NEWS_FETCH_TIMEOUT):
+        self.call_tool = call_tool
+        self.per_domain = per_domain
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._domains = {}
+
+    async def fetch(self, url):
+        domain = urlsplit(url).netloc.lower()
+        domain_slots = self._domains.setdefault(domain, asyncio.Semaphore(self.per_domain))
+        async with domain_slots, self._slots:
+            return str(await asyncio.wait_for(self.call_tool('fetch_content', {'url': url}), self.timeout))
+
+
+def format_articles(articles):
+    return "\n\n".join(
+        f"[{i}] {article['title']} ({article['url']})\n{article['text']}"
+        for i, article in enumerate(articles, 1)
+    )
+
+
+def format_sources(articles):
+    lines = []
+    for i, article in enumerate(articles, 1):
+        line = f"{i}. [{article['title']}]({article['url']})"
+        if article.get('mirrors'):
+            line += " · also on " + ", ".join(
+                f"[{urlsplit(url).netloc}]({url})" for url in article['mirrors']
+            )
+        lines.append(line)
+    return "\n\n### Sources\n" + "\n".join(lines)
+
+
+def _default_call_tool():
+    # Imported here so the module loads without the optional MCP dependency
+    try:
+        from get_mcp import get_pool
+    except ImportError as e:
+        raise NewsSearchError(f"MCP is not installed: {str(e)}") from e
+    return get_pool().call_tool
+
+
+async def afetch_grounded_news(llm, topic, on_chunk=None, use_cache=True, timings=None, call_tool=None,
+                               on_status=None):
+    """
+    Fetch current news for a topic from the web and summarize it
+
+    Stages overlap: each page is fetched as soon as the search returns and
+    extracted as soon as it arrives. The digest is written once
+    NEWS_MAX_ARTICLES pages are in or NEWS_FETCH_DEADLINE passes, so a slow
+    site delays the result by at most the deadline.
+
+    Args:
+        llm: Chat model instance
+        topic (str): News topic
+        on_chunk (callable): Called with the accumulated digest, then the digest with its sources list
+        use_cache (bool): Serve a cached digest when the same articles were summarized before
+        timings (dict): Receives the pipeline's timing under 'news'
+        call_tool (callable): Async (tool name, arguments) -> result; defaults to the MCP pool
+        on_status (callable): Called with a progress notice before the digest starts
+
+    Returns:
+        str: Markdown digest with a sources list
+
+    Raises:
+        NewsSearchError: Search failed or found nothing
+    """
+    start = time.perf_counter()
+    call_tool = call_tool or _default_call_tool()
+    notify = on_status or (lambda text: None)
+
+    notify("*🔎 Searching the web for recent coverage...*")
+    try:
+        raw = await asyncio.wait_for(
+            call_tool('search', {'query': f"{topic} latest news", 'max_results': NEWS_SEARCH_RESULTS}),
+            NEWS_FETCH_TIMEOUT
+        )
+    except Exception as e:
+        raise NewsSearchError(f"Web search failed: {str(e)}") from e
+    results = parse_search_results(str(raw))[:NEWS_SEARCH_RESULTS]
+    if not results:
+        raise NewsSearchError("Web search returned no results")
+
+    fetcher = PoliteFetcher(call_tool)
+
+    async def fetch_and_extract(rank, result):
+        try:
+            text = extract_main_text(await fetcher.fetch(result['url']))
+        except Exception:
+            text = ""
+        return rank, {**result, 'text': text or result['snippet']}
+
+    pending = [asyncio.ensure_future(fetch_and_extract(rank, result)) for rank, result in enumerate(results)]
+    fetched = []
+    try:
+        for next_done in asyncio.as_completed(pending, timeout=NEWS_FETCH_DEADLINE):
+            rank, article = await next_done
+            if not article['text']:
+                continue
+            fetched.append((rank, article))
+            notify(f"*📰 Read {len(fetched)} of {min(NEWS_MAX_ARTICLES, len(results))} sources...*\n\n" +
+                   "\n".join(f"- {a['title']}" for _, a in fetched))
+            if len(fetched) >= NEWS_MAX_ARTICLES:
+                break
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if not fetched:
+        # Every fetch failed or timed out: the search snippets are still current
+        fetched = [(rank, {**result, 'text': result['snippet']})
+                   for rank, result in enumerate(results[:NEWS_MAX_ARTICLES]) if result['snippet']]
+    if not fetched:
+        raise NewsSearchError("No readable articles found")
+    # Present articles in search rank order so identical fetches give identical prompts
+    articles = [article for _, article in sorted(fetched, key=lambda item: item[0])]
+
+    # Syndicated and mirrored stories are sent once, under the best-ranked copy
+    articles, duplicates, dedup_stats = deduplicate(articles, text=lambda article: article['text'])
+    for duplicate, original in duplicates:
+        original.setdefault('mirrors', []).append(duplicate['url'])
+    if duplicates:
+        notify(f"*🧹 Merged {len(duplicates)} duplicate sources (~{dedup_stats['tokens_saved']} tokens saved)*")
+
+    # Lowest-ranked articles are left out first when the prompt would exceed the news budget
+    available = budget_for('news')['input'] - estimate_tokens(GROUNDED_NEWS_PROMPT.template) - estimate_tokens(topic)
+    articles = pack(articles, available, text=lambda article: format_articles([article]))
+    if len(articles) == 1:
+        articles[0] = {**articles[0], 'text': truncate(articles[0]['text'], available - 50)}
+
+    sources = format_sources(articles)
+    digest_start = time.perf_counter()
+    digest = await research.arun_chain(
+        get_chain(llm, 'grounded_news', build_grounded_news_chain),
+        {'date': datetime.date.today().isoformat(), 'topic': topic, 'articles': format_articles(articles)},
+        'news',
+        on_chunk,
+        use_cache,
+        timings
+    )
+    if timings is not None and 'news' in timings:
+        # Report the whole pipeline, not just the digest call
+        timing = timings['news']
+        if timing['ttft'] is not None:
+            timing['ttft'] += digest_start - start
+        timing['duration'] = time.perf_counter() - start
+        if duplicates:
+            timing['deduplicated'] = dedup_stats
+    if on_chunk:
+        # The sources list follows the digest in the stream too, so it ends with the returned text
+        on_chunk(digest + sources)
+    return digest + sources
@@ -0,0 +1,68 @@
+"""
+Profiler Module
+Times the sections of a Streamlit rerun, to show where server time goes between user actions
+
+Enable it for every session with RERUN_PROFILE=1, or for one browser tab by adding ?profile=1 to the URL.
+"""
+from collections import deque
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+RERUN_PROFILE = bool(int(os.getenv("RERUN_PROFILE", "0")))
+# Reruns per session kept for the rolling section statistics
+RERUN_PROFILE_HISTORY = int(os.getenv("RERUN_PROFILE_HISTORY", "50"))
+
+
+class RerunProfiler:
+    """
+    Checkpoint timer for one script run
+
+    Each mark() closes a section that started at the previous mark, so
+    sections can be added to a top-to-bottom script without re-indenting it.
+    """
+
+    def __init__(self, enabled=RERUN_PROFILE):
+        self.enabled = enabled
+        self.sections = []
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, name):
+        """Close the section that ends here"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.sections.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self._start
+
+    def record(self, history):
+        """
+        Add this run to a session's rolling history and log it
+
+        Args:
+            history (dict): Section name to deque of durations, kept in session state
+
+        Returns:
+            list: Rows with each section's last, p50 and p95 time in milliseconds, plus a total row
+        """
+        if not self.enabled:
+            return []
+        from metrics import percentile
+        for name, seconds in self.sections + [('total', self.total)]:
+            history.setdefault(name, deque(maxlen=RERUN_PROFILE_HISTORY)).append(seconds)
+        logger.info("Rerun %.1fms: %s", self.total * 1000,
+                    " · ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.sections))
+        last = dict(self.sections + [('total', self.total)])
+        return [{
+            'section': name,
+            'last ms': round(last.get(name, 0.0) * 1000, 2),
+            'p50 ms': round(percentile(values, 50) * 1000, 2),
+            'p95 ms': round(percentile(values, 95) * 1000, 2),
+            'reruns': len(values),
+        } for name, values in sorted(history.items(), key=lambda item: item[0] == 'total')]
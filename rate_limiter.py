@@ -0,0 +1,335 @@
+"""
+Rate Limiter Module
+Per-API-key token-bucket limits and retry with jittered exponential backoff
+"""
+from collections import OrderedDict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables import RunnableLambda
+import asyncio
+import contextvars
+import hashlib
+import os
+import random
+import threading
+import time
+from metrics import record_retry
+from token_budget import DEFAULT_BUDGET, estimate_tokens
+
+# Budgets per API key (defaults match the Gemini free tier for gemini-2.0-flash)
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", str(max(1, int(GEMINI_RPM // 4)))))
+
+# Retry policy for retryable provider errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "30.0"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_MARKERS = (
+    "429", "rate limit", "resource exhausted", "resource_exhausted", "quota",
+    "unavailable", "deadline exceeded", "timed out", "timeout",
+)
+
+
+# Estimated tokens of the call about to acquire the limiter, as (limiter, run id, tokens).
+# Set by the usage handler when a call starts; its acquire() runs next in the same context.
+_pending_call = contextvars.ContextVar('pending_call', default=None)
+
+
+def estimate_call_tokens(messages, invocation_params=None):
+    """
+    Estimate the tokens a chat call will use: its prompt plus its output limit
+
+    Args:
+        messages (list): Prompt messages
+        invocation_params (dict): Model parameters of the call, for the output limit
+
+    Returns:
+        int: Estimated tokens
+    """
+    params = invocation_params or {}
+    output = params.get('max_output_tokens') or params.get('max_tokens') or DEFAULT_BUDGET['output']
+    return sum(estimate_tokens(str(message.content)) for message in messages) + int(output)
+
+
+class _UsageHandler(BaseCallbackHandler):
+    """Hands each call's token estimate to the limiter, then settles it with actual usage"""
+
+    # Thread-safe and cheap, so run in the caller's thread even inside async runs;
+    # running inline is also what lets acquire() see the estimate set at start
+    run_inline = True
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        tokens = sum(estimate_call_tokens(batch, kwargs.get('invocation_params')) for batch in messages)
+        _pending_call.set((self.limiter, run_id, tokens))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        total = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if usage:
+                    total += usage.get('total_tokens', 0)
+        self.limiter.settle(run_id, total or None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        # A failed call is not billed for its output; refund what was reserved
+        self.limiter.settle(run_id, 0)
+
+
+class TokenBucketLimiter(BaseRateLimiter):
+    """
+    Requests-per-minute and tokens-per-minute token buckets
+
+    A request waits until a request token is available and the token budget
+    covers its estimated prompt and output tokens, which are reserved before
+    the call starts so concurrent calls cannot overdraw the budget together.
+    When the call finishes the reservation is settled against the provider's
+    usage metadata.
+    """
+
+    def __init__(self, requests_per_minute=GEMINI_RPM, tokens_per_minute=GEMINI_TPM, burst=GEMINI_BURST):
+        self.requests_per_second = requests_per_minute / 60.0
+        self.tokens_per_second = tokens_per_minute / 60.0
+        self.burst = burst
+        self.token_capacity = tokens_per_minute
+        self._requests = burst
+        self._tokens = tokens_per_minute
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._reserved = {}
+        self._lock = threading.Lock()
+        self.usage_handler = _UsageHandler(self)
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.burst, self._requests + elapsed * self.requests_per_second)
+        self._tokens = min(self.token_capacity, self._tokens + elapsed * self.tokens_per_second)
+
+    def _wait_time(self, queued=0, tokens=0):
+        """Seconds until a request behind `queued` others could start; caller holds the lock"""
+        request_wait = max(0.0, queued + 1 - self._requests) / self.requests_per_second
+        token_wait = max(0.0, self._needed(tokens) - self._tokens) / self.tokens_per_second
+        return max(request_wait, token_wait)
+
+    def _needed(self, tokens):
+        # A call larger than the whole budget waits for a full bucket instead of forever
+        return max(1.0, min(tokens, self.token_capacity))
+
+    def _pending(self):
+        """The estimate set for this limiter by the call about to acquire it, as (run id, tokens)"""
+        pending = _pending_call.get()
+        if pending is None or pending[0] is not self:
+            return None, 0
+        _pending_call.set(None)
+        return pending[1], pending[2]
+
+    def _try_acquire(self, run_id, tokens):
+        with self._lock:
+            self._refill()
+            if self._requests >= 1 and self._tokens >= self._needed(tokens):
+                self._requests -= 1
+                self._tokens -= tokens
+                if run_id is not None:
+                    self._reserved[run_id] = tokens
+                return True, 0.0
+            return False, self._wait_time(tokens=tokens)
+
+    def acquire(self, *, blocking=True):
+        run_id, tokens = self._pending()
+        acquired, wait = self._try_acquire(run_id, tokens)
+        if acquired or not blocking:
+            return acquired
+        with self._lock:
+            self._waiting += 1
+        try:
+            while not acquired:
+                time.sleep(min(max(wait, 0.01), 1.0))
+                acquired, wait = self._try_acquire(run_id, tokens)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        return True
+
+    async def aacquire(self, *, blocking=True):
+        run_id, tokens = self._pending()
+        acquired, wait = self._try_acquire(run_id, tokens)
+        if acquired or not blocking:
+            return acquired
+        with self._lock:
+            self._waiting += 1
+        try:
+            while not acquired:
+                await asyncio.sleep(min(max(wait, 0.01), 1.0))
+                acquired, wait = self._try_acquire(run_id, tokens)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        return True
+
+    def settle(self, run_id, tokens):
+        """
+        Replace a call's reservation with the tokens it actually used
+
+        Args:
+            run_id: Callback run id of the call
+            tokens (int): Tokens used, or None when the provider reported no usage
+                (the reservation then stands)
+        """
+        with self._lock:
+            self._refill()
+            reserved = self._reserved.pop(run_id, None)
+            if reserved is None:
+                # The call never reserved (e.g. no estimate reached acquire): debit usage as it comes
+                self._tokens -= tokens or 0
+            elif tokens is not None:
+                self._tokens += reserved - tokens
+
+    def estimate_wait(self):
+        """
+        Estimate how long a new request would queue
+
+        Returns:
+            float: Seconds until a new request could start
+        """
+        with self._lock:
+            self._refill()
+            return self._wait_time(self._waiting)
+
+
+# Limiters are shared by every session using the same API key
+LIMITER_MAX_KEYS = 1024
+_limiters = OrderedDict()
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api_key):
+    """
+    Get the shared limiter for an API key
+
+    Args:
+        api_key (str): Google Gemini API key
+
+    Returns:
+        TokenBucketLimiter: Limiter shared by every client using the key
+    """
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = TokenBucketLimiter()
+        _limiters.move_to_end(key)
+        while len(_limiters) > LIMITER_MAX_KEYS:
+            _limiters.popitem(last=False)
+        return limiter
+
+
+def is_retryable(error):
+    """
+    Decide whether an error is transient (rate limit, overload, timeout)
+
+    Args:
+        error (Exception): Raised error
+
+    Returns:
+        bool: True when retrying may succeed
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    for attr in ('status_code', 'code', 'status'):
+        status = getattr(error, attr, None)
+        if isinstance(status, int) and status in RETRYABLE_STATUS:
+            return True
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for a zero-based retry attempt"""
+    return random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def call_with_retry(fn, *args, **kwargs):
+    """Call fn, retrying retryable errors with jittered exponential backoff"""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            record_retry()
+            time.sleep(backoff_delay(attempt))
+
+
+async def acall_with_retry(fn, *args, **kwargs):
+    """Async counterpart of call_with_retry for coroutine functions"""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            record_retry()
+            await asyncio.sleep(backoff_delay(attempt))
+
+
+def stream_with_retry(chain, inputs, config=None):
+    """
+    Stream a chain, retrying retryable errors raised before the first chunk
+
+    Once output has been yielded a failure is re-raised, since replaying the
+    stream would duplicate text already shown to the user.
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            for chunk in chain.stream(inputs, config):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            record_retry()
+            time.sleep(backoff_delay(attempt))
+
+
+async def astream_with_retry(chain, inputs, config=None):
+    """Async counterpart of stream_with_retry"""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            async for chunk in chain.astream(inputs, config):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            record_retry()
+            await asyncio.sleep(backoff_delay(attempt))
+
+
+def retrying(chain):
+    """
+    Wrap a chain so invoke/batch/abatch retry each input independently
+
+    Args:
+        chain: Runnable to wrap
+
+    Returns:
+        RunnableLambda: Runnable with per-input retry
+    """
+    def invoke(inputs):
+        return call_with_retry(chain.invoke, inputs)
+
+    async def ainvoke(inputs):
+        return await acall_with_retry(chain.ainvoke, inputs)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
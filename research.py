@@ -0,0 +1,555 @@
+"""
+Research Module
+Prompt chains and execution for reports, news, summaries and Q&A, independent of the Streamlit UI
+"""
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+import asyncio
+import datetime
+import logging
+import os
+import re
+import time
+from response_cache import get_response_cache, chain_key
+from chunking import split_markdown
+from dedup import deduplicate_paragraphs
+from token_budget import (
+    budget_for, estimate_tokens, limit_output, pack, prompt_tokens, record_usage, truncate, UsageRecorder
+)
+from retrieval import BM25Index
+from metrics import task_context
+from llm import get_chain
+from rate_limiter import (
+    call_with_retry, acall_with_retry,
+    stream_with_retry, astream_with_retry, retrying
+)
+
+logger = logging.getLogger(__name__)
+
+str_parse = StrOutputParser()
+
+# Map-reduce summarization settings (characters)
+SUMMARY_MAP_REDUCE_THRESHOLD = int(os.getenv("SUMMARY_MAP_REDUCE_THRESHOLD", "12000"))
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "6000"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+
+# Longest topic slug used in saved report filenames
+SLUG_MAX_CHARS = 80
+
+# Q&A retrieval settings
+QNA_CHUNK_CHARS = int(os.getenv("QNA_CHUNK_CHARS", "1500"))
+QNA_TOP_K = int(os.getenv("QNA_TOP_K", "4"))
+
+# Prompts
+REPORT_PROMPT = PromptTemplate(
+    template="""You are an expert research assistant. Create a comprehensive, well-structured research report about: {topic}
+    
+    Structure your report with:
+    
+    ## Introduction
+    Provide a clear, engaging overview of the topic.
+    
+    ## Key Findings
+    List the most important facts, statistics, and insights with specific details.
+    
+    ## Recent Developments
+    Highlight recent news, trends, breakthroughs, and innovations.
+    
+    ## Analysis
+    Provide deeper analysis and context for the findings.
+    
+    ## Conclusion
+    Summarize the main points and their significance for the future.
+    
+    Make it informative, well-structured, professional, and easy to read. Use markdown formatting.""",
+    input_variables=['topic']
+)
+
+NEWS_PROMPT = PromptTemplate(
+    template="""You are a news aggregator and analyst. Find and summarize the latest news about: {topic}
+    
+    Provide:
+    
+    ## Latest Headlines
+    List 5-7 recent, relevant news headlines with brief context.
+    
+    ## Key Updates
+    Summarize the most important recent developments and their impact.
+    
+    ## Trending Topics
+    Mention what's currently trending, being discussed, or gaining attention.
+    
+    ## Industry Impact
+    Explain how these developments affect the industry or field.
+    
+    Focus on recent, relevant, and credible information. Use markdown formatting.""",
+    input_variables=['topic']
+)
+
+SUMMARY_PROMPT = PromptTemplate(
+    template="""Create a concise, well-organized summary of the following content:
+    
+    {content}
+    
+    Your summary should:
+    - Highlight the main points and key takeaways
+    - Be clear, concise, and easy to understand
+    - Keep only the most important information
+    - Be structured with bullet points or short paragraphs
+    - Be approximately 200-300 words
+    
+    Use markdown formatting for better readability.""",
+    input_variables=['content']
+)
+
+SUMMARY_MAP_PROMPT = PromptTemplate(
+    template="""The following is one part of a longer document. Summarize this part only:
+    
+    {content}
+    
+    Keep the key facts, figures, and conclusions. Use concise markdown bullet points.""",
+    input_variables=['content']
+)
+
+SUMMARY_REDUCE_PROMPT = PromptTemplate(
+    template="""The following are summaries of consecutive parts of one document:
+    
+    {summaries}
+    
+    Combine them into a single concise, well-organized summary that should:
+    - Highlight the main points and key takeaways
+    - Be clear, concise, and easy to understand
+    - Keep only the most important information
+    - Be structured with bullet points or short paragraphs
+    - Be approximately 200-300 words
+    
+    Use markdown formatting for better readability.""",
+    input_variables=['summaries']
+)
+
+QNA_PROMPT = PromptTemplate(
+    template="""Based on the following research content, answer the question accurately, concisely, and helpfully.
+    
+    Research Content:
+    {context}
+    
+    Question: {question}
+    
+    Provide a clear, informative answer. If the information isn't in the research, say so and provide general knowledge if helpful.""",
+    input_variables=['context', 'question']
+)
+
+
+# Chains
+def build_report_chain(llm):
+    """Build the report generation chain"""
+    return REPORT_PROMPT | limit_output(llm, 'report') | str_parse
+
+def build_news_chain(llm):
+    """Build the news chain"""
+    return NEWS_PROMPT | limit_output(llm, 'news') | str_parse
+
+def build_summary_chain(llm):
+    """Build the summary chain"""
+    return SUMMARY_PROMPT | limit_output(llm, 'summary') | str_parse
+
+def build_summary_map_chain(llm):
+    """Build the chain that condenses one section of a long document"""
+    return SUMMARY_MAP_PROMPT | limit_output(llm, 'summary_map') | str_parse
+
+def build_summary_reduce_chain(llm):
+    """Build the chain that merges partial summaries into the final summary"""
+    return SUMMARY_REDUCE_PROMPT | limit_output(llm, 'summary') | str_parse
+
+def build_qna_chain(llm):
+    """Build the Q&A chain"""
+    return QNA_PROMPT | limit_output(llm, 'qna') | str_parse
+
+# Task registry: each task's chain is compiled once per registered LLM client and reused
+CHAIN_BUILDERS = {
+    'report': build_report_chain,
+    'news': build_news_chain,
+    'summary': build_summary_chain,
+    'summary_map': build_summary_map_chain,
+    'summary_reduce': build_summary_reduce_chain,
+    'qna': build_qna_chain,
+}
+
+def get_task_chain(llm, task):
+    """Get the compiled chain for a task from the registry"""
+    return get_chain(llm, task, CHAIN_BUILDERS[task])
+
+# Execution
+def _record_timing(timings, task, start, ttft, cached, tokens=None):
+    """Store time-to-first-token, total duration and token usage for a task"""
+    if timings is not None:
+        timings[task] = {
+            'ttft': ttft,
+            'duration': time.perf_counter() - start,
+            'cached': cached
+        }
+        if tokens:
+            timings[task]['tokens'] = tokens
+
+def _fit(text, task, prompt, reserve=0):
+    """Truncate a prompt input so the filled prompt stays within the task's input budget"""
+    return truncate(text, budget_for(task)['input'] - estimate_tokens(prompt.template) - reserve)
+
+def _check_budget(chain, inputs, task):
+    """Estimate a call's prompt tokens, warning when callers left it over budget"""
+    predicted = prompt_tokens(chain, inputs)
+    if predicted > budget_for(task)['input']:
+        logger.warning("%s prompt is ~%d tokens, over its %d token budget",
+                       task, predicted, budget_for(task)['input'])
+    return predicted
+
+def _record_dedup(timings, task, stats):
+    """Attach near-duplicate removal stats to a task's timings"""
+    if timings is not None and task in timings and stats['duplicates']:
+        timings[task]['deduplicated'] = stats
+
+def run_chain(chain, inputs, task, on_chunk=None, use_cache=True, timings=None):
+    """
+    Run a chain through the response cache, streaming when on_chunk is given
+    
+    Args:
+        chain: Runnable that produces text
+        inputs (dict): Chain input variables
+        task (str): Task name used for timings and the cache TTL
+        on_chunk (callable): Called with the accumulated text after each streamed chunk
+        use_cache (bool): Serve a cached response when available
+        timings (dict): Receives {'ttft', 'duration', 'cached', 'tokens'} under the task name
+        
+    Returns:
+        str: Complete generated text
+    """
+    start = time.perf_counter()
+    cache = get_response_cache()
+    key = chain_key(chain, inputs)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record_timing(timings, task, start, None, True)
+            return cached
+    
+    predicted = _check_budget(chain, inputs, task)
+    recorder = UsageRecorder()
+    config = {'callbacks': [recorder]}
+    ttft = None
+    with task_context(task):
+        if on_chunk is None:
+            text = call_with_retry(chain.invoke, inputs, config=config)
+        else:
+            text = ""
+            for chunk in stream_with_retry(chain, inputs, config):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                text += chunk
+                on_chunk(text)
+    
+    cache.set(key, task, text)
+    _record_timing(timings, task, start, ttft, False, record_usage(task, predicted, recorder))
+    return text
+
+async def arun_chain(chain, inputs, task, on_chunk=None, use_cache=True, timings=None):
+    """Async counterpart of run_chain using ainvoke/astream"""
+    start = time.perf_counter()
+    cache = get_response_cache()
+    key = chain_key(chain, inputs)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record_timing(timings, task, start, None, True)
+            return cached
+    
+    predicted = _check_budget(chain, inputs, task)
+    recorder = UsageRecorder()
+    config = {'callbacks': [recorder]}
+    ttft = None
+    with task_context(task):
+        if on_chunk is None:
+            text = await acall_with_retry(chain.ainvoke, inputs, config=config)
+        else:
+            text = ""
+            async for chunk in astream_with_retry(chain, inputs, config):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                text += chunk
+                on_chunk(text)
+    
+    cache.set(key, task, text)
+    _record_timing(timings, task, start, ttft, False, record_usage(task, predicted, recorder))
+    return text
+
+def batch_chain(chain, inputs_list, task, max_concurrency, use_cache=True):
+    """
+    Run a chain over many inputs with bounded concurrency, reusing cached results
+    
+    Args:
+        chain: Runnable that produces text
+        inputs_list (list): Chain input dicts
+        task (str): Task name used for the cache TTL
+        max_concurrency (int): Maximum number of calls in flight
+        use_cache (bool): Serve cached responses when available
+        
+    Returns:
+        list: Generated text in input order
+    """
+    cache = get_response_cache()
+    keys = [chain_key(chain, inputs) for inputs in inputs_list]
+    results = [cache.get(key) if use_cache else None for key in keys]
+    pending = [i for i, text in enumerate(results) if text is None]
+    if pending:
+        with task_context(task):
+            outputs = retrying(chain).batch(
+                [inputs_list[i] for i in pending],
+                config={'max_concurrency': max_concurrency}
+            )
+        for i, text in zip(pending, outputs):
+            cache.set(keys[i], task, text)
+            results[i] = text
+    return results
+
+async def abatch_chain(chain, inputs_list, task, max_concurrency, use_cache=True):
+    """Async counterpart of batch_chain using abatch"""
+    cache = get_response_cache()
+    keys = [chain_key(chain, inputs) for inputs in inputs_list]
+    results = [cache.get(key) if use_cache else None for key in keys]
+    pending = [i for i, text in enumerate(results) if text is None]
+    if pending:
+        with task_context(task):
+            outputs = await retrying(chain).abatch(
+                [inputs_list[i] for i in pending],
+                config={'max_concurrency': max_concurrency}
+            )
+        for i, text in zip(pending, outputs):
+            cache.set(keys[i], task, text)
+            results[i] = text
+    return results
+
+# Tasks
+def generate_report_content(llm, topic, on_chunk=None, use_cache=True, timings=None):
+    """Generate comprehensive research report"""
+    inputs = {'topic': _fit(topic, 'report', REPORT_PROMPT)}
+    return run_chain(get_task_chain(llm, 'report'), inputs, 'report', on_chunk, use_cache, timings)
+
+async def agenerate_report_content(llm, topic, on_chunk=None, use_cache=True, timings=None):
+    """Async counterpart of generate_report_content"""
+    inputs = {'topic': _fit(topic, 'report', REPORT_PROMPT)}
+    return await arun_chain(get_task_chain(llm, 'report'), inputs, 'report', on_chunk, use_cache, timings)
+
+def fetch_news_content(llm, topic, on_chunk=None, use_cache=True, timings=None, grounded=False, on_status=None):
+    """Fetch latest news and updates, from live web results when grounded is set"""
+    if grounded:
+        return asyncio.run(afetch_news_content(llm, topic, on_chunk, use_cache, timings, True, on_status))
+    inputs = {'topic': _fit(topic, 'news', NEWS_PROMPT)}
+    return run_chain(get_task_chain(llm, 'news'), inputs, 'news', on_chunk, use_cache, timings)
+
+async def afetch_news_content(llm, topic, on_chunk=None, use_cache=True, timings=None, grounded=False,
+                              on_status=None):
+    """Async counterpart of fetch_news_content"""
+    if grounded:
+        # Imported here to keep the web pipeline out of ungrounded runs
+        from news_pipeline import afetch_grounded_news, NewsSearchError
+        try:
+            return await afetch_grounded_news(llm, topic, on_chunk, use_cache, timings, on_status=on_status)
+        except NewsSearchError as e:
+            logger.warning("%s; using the model alone", e)
+    inputs = {'topic': _fit(topic, 'news', NEWS_PROMPT)}
+    return await arun_chain(get_task_chain(llm, 'news'), inputs, 'news', on_chunk, use_cache, timings)
+
+def _join_summaries(partials):
+    """Join partial summaries, trimming each evenly when together they exceed the reduce budget"""
+    available = budget_for('summary')['input'] - estimate_tokens(SUMMARY_REDUCE_PROMPT.template)
+    share = max(1, available // max(1, len(partials)) - 2)
+    return "\n\n---\n\n".join(truncate(partial, share) for partial in partials)
+
+def create_summary_content(llm, content, on_chunk=None, use_cache=True, timings=None):
+    """Create concise summary of deduplicated content, using map-reduce for long content"""
+    content, dedup_stats = deduplicate_paragraphs(content)
+    if len(content) <= SUMMARY_MAP_REDUCE_THRESHOLD:
+        inputs = {'content': _fit(content, 'summary', SUMMARY_PROMPT)}
+        summary = run_chain(get_task_chain(llm, 'summary'), inputs, 'summary', on_chunk, use_cache, timings)
+        _record_dedup(timings, 'summary', dedup_stats)
+        return summary
+    
+    start = time.perf_counter()
+    chunks = split_markdown(content, SUMMARY_CHUNK_CHARS)
+    partials = batch_chain(
+        get_task_chain(llm, 'summary_map'),
+        [{'content': _fit(chunk, 'summary_map', SUMMARY_MAP_PROMPT)} for chunk in chunks],
+        'summary',
+        SUMMARY_MAX_CONCURRENCY,
+        use_cache
+    )
+    summary = run_chain(
+        get_task_chain(llm, 'summary_reduce'),
+        {'summaries': _join_summaries(partials)},
+        'summary',
+        on_chunk,
+        use_cache,
+        timings
+    )
+    if timings is not None:
+        timings['summary']['duration'] = time.perf_counter() - start
+    _record_dedup(timings, 'summary', dedup_stats)
+    return summary
+
+async def acreate_summary_content(llm, content, on_chunk=None, use_cache=True, timings=None):
+    """Async counterpart of create_summary_content"""
+    content, dedup_stats = deduplicate_paragraphs(content)
+    if len(content) <= SUMMARY_MAP_REDUCE_THRESHOLD:
+        inputs = {'content': _fit(content, 'summary', SUMMARY_PROMPT)}
+        summary = await arun_chain(get_task_chain(llm, 'summary'), inputs, 'summary', on_chunk, use_cache, timings)
+        _record_dedup(timings, 'summary', dedup_stats)
+        return summary
+    
+    start = time.perf_counter()
+    chunks = split_markdown(content, SUMMARY_CHUNK_CHARS)
+    partials = await abatch_chain(
+        get_task_chain(llm, 'summary_map'),
+        [{'content': _fit(chunk, 'summary_map', SUMMARY_MAP_PROMPT)} for chunk in chunks],
+        'summary',
+        SUMMARY_MAX_CONCURRENCY,
+        use_cache
+    )
+    summary = await arun_chain(
+        get_task_chain(llm, 'summary_reduce'),
+        {'summaries': _join_summaries(partials)},
+        'summary',
+        on_chunk,
+        use_cache,
+        timings
+    )
+    if timings is not None:
+        timings['summary']['duration'] = time.perf_counter() - start
+    _record_dedup(timings, 'summary', dedup_stats)
+    return summary
+
+def build_report_index(report_text):
+    """Build the Q&A retrieval index over a report"""
+    return BM25Index.from_markdown(report_text, QNA_CHUNK_CHARS)
+
+def _qna_inputs(index, question):
+    """
+    Q&A prompt inputs within the Q&A budget: the lowest-ranked chunks are dropped first,
+    then the context is truncated if the best chunk alone is too large
+    """
+    question = _fit(question, 'qna', QNA_PROMPT, reserve=budget_for('qna')['input'] // 2)
+    available = budget_for('qna')['input'] - estimate_tokens(QNA_PROMPT.template) - estimate_tokens(question)
+    ranked = index.ranked(question, QNA_TOP_K)
+    kept = pack(ranked, available, text=lambda i: index.chunks[i] + "\n\n")
+    context = truncate("\n\n".join(index.chunks[i] for i in sorted(kept)), available)
+    return {'context': context, 'question': question}
+
+def answer_question(llm, question, context, index=None, on_chunk=None, use_cache=True, timings=None):
+    """
+    Answer questions using only the context chunks relevant to the question
+    
+    Args:
+        llm: Chat model instance
+        question (str): User question
+        context (str): Research content
+        index (BM25Index): Prebuilt index over the context, built on demand if omitted
+        
+    Returns:
+        str: Generated answer
+    """
+    index = index or build_report_index(context)
+    return run_chain(
+        get_task_chain(llm, 'qna'), _qna_inputs(index, question), 'qna', on_chunk, use_cache, timings
+    )
+
+async def aanswer_question(llm, question, context, index=None, on_chunk=None, use_cache=True, timings=None):
+    """Async counterpart of answer_question"""
+    index = index or build_report_index(context)
+    return await arun_chain(
+        get_task_chain(llm, 'qna'), _qna_inputs(index, question), 'qna', on_chunk, use_cache, timings
+    )
+
+async def arun_full_research(llm, topic, on_chunk=None, on_result=None, use_cache=True, timings=None,
+                             grounded=False, on_status=None):
+    """
+    Run report and news concurrently, then summarize the report as soon as it lands
+    
+    Args:
+        llm: Chat model instance
+        topic (str): Research topic
+        on_chunk (callable): Called as on_chunk(task, text) while output streams
+        on_result (callable): Called as on_result(task, text) when each task finishes
+        use_cache (bool): Serve cached responses when available
+        timings (dict): Receives per-task timings
+        grounded (bool): Ground news in live web results
+        on_status (callable): Called as on_status(task, text) with progress notices
+        
+    Returns:
+        dict: Result text or raised exception keyed by task
+    """
+    results = {}
+    
+    def stream_to(task, callback=on_chunk):
+        return (lambda text: callback(task, text)) if callback else None
+    
+    async def run_task(task, pending):
+        try:
+            text = await pending
+        except Exception as e:
+            results[task] = e
+            return None
+        results[task] = text
+        if on_result:
+            on_result(task, text)
+        return text
+    
+    async def report_then_summary():
+        report_text = await run_task(
+            'report', agenerate_report_content(llm, topic, stream_to('report'), use_cache, timings)
+        )
+        if report_text:
+            await run_task(
+                'summary', acreate_summary_content(llm, report_text, stream_to('summary'), use_cache, timings)
+            )
+    
+    await asyncio.gather(
+        report_then_summary(),
+        run_task('news', afetch_news_content(
+            llm, topic, stream_to('news'), use_cache, timings, grounded, stream_to('news', on_status)
+        ))
+    )
+    return results
+
+OUTPUT_TITLES = {'report': "Research Report", 'news': "News", 'summary': "Summary"}
+
+def slugify(text, max_chars=SLUG_MAX_CHARS):
+    """
+    Filename-safe form of a topic: only letters, digits, '_' and '-', truncated
+
+    Args:
+        text (str): Topic or title
+        max_chars (int): Maximum slug length
+
+    Returns:
+        str: Slug, or 'untitled' when nothing safe remains
+    """
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", text.strip()).strip("_-")[:max_chars].rstrip("_-")
+    return slug or "untitled"
+
+def save_report(topic, report_text, directory="reports", kind="report"):
+    """
+    Auto-save a report (or news/summary output) as Markdown
+    
+    Args:
+        topic (str): Research topic
+        report_text (str): Generated text
+        directory (str): Output directory
+        kind (str): Output type, used for the file prefix and title
+        
+    Returns:
+        str: Path of the saved file
+    """
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    filename = os.path.join(directory, f"{kind}_{slugify(topic)}_{timestamp}.md")
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(f"# {OUTPUT_TITLES.get(kind, kind.capitalize())}: {topic}\n\n{report_text}")
+    return filename
@@ -0,0 +1,203 @@
+"""
+Response Cache Module
+Disk-backed SQLite cache for LLM responses with per-task TTLs and LRU eviction
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default time-to-live per task, in seconds
+DEFAULT_TTLS = {
+    'report': 7 * 24 * 3600,
+    'summary': 7 * 24 * 3600,
+    'news': 3600,
+    'qna': 24 * 3600,
+    'feedback': 30 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+DEFAULT_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(".cache", "responses.sqlite3"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+
+
+def _normalize(value):
+    """Collapse whitespace and case so trivially different inputs share a key"""
+    return " ".join(str(value).split()).casefold()
+
+
+def model_config(llm):
+    """
+    Extract the generation settings that affect an LLM's output
+
+    Args:
+        llm: Chat model instance
+
+    Returns:
+        dict: Model name, temperature and max_tokens
+    """
+    return {
+        'model': getattr(llm, 'model', None) or getattr(llm, 'model_name', None) or type(llm).__name__,
+        'temperature': getattr(llm, 'temperature', None),
+        # Output limits bound per call (see token_budget.limit_output) take precedence
+        'max_tokens': (getattr(llm, 'kwargs', None) or {}).get('max_output_tokens')
+                      or getattr(llm, 'max_tokens', None) or getattr(llm, 'max_output_tokens', None),
+    }
+
+
+def make_key(llm, templates, inputs):
+    """
+    Build a cache key from model configuration, prompt templates and inputs
+
+    Args:
+        llm: Chat model instance
+        templates (list): Prompt template strings used by the pipeline
+        inputs (dict): Prompt input variables
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    template_hash = hashlib.sha256("\x00".join(templates).encode("utf-8")).hexdigest()
+    payload = {
+        'llm': model_config(llm),
+        'template': template_hash,
+        'inputs': {k: _normalize(v) for k, v in sorted(inputs.items())},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def chain_key(chain, inputs):
+    """
+    Build a cache key for a `prompt | llm | parser` chain
+
+    Args:
+        chain: Runnable sequence
+        inputs (dict): Chain input variables
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    steps = getattr(chain, 'steps', [chain])
+    templates = [step.template for step in steps if hasattr(step, 'template')]
+    llms = [step for step in steps if hasattr(step, 'temperature')]
+    return make_key(llms[0] if llms else None, templates, inputs)
+
+
+class ResponseCache:
+    """SQLite-backed response cache with per-task expiry and LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttls=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                task TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            str: Cached response, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, task, value):
+        """
+        Store a response and evict least recently used entries over the size cap
+
+        Args:
+            key (str): Cache key
+            task (str): Task name used to pick the TTL
+            value (str): Response text
+        """
+        now = time.time()
+        ttl = self.ttls.get(task, DEFAULT_TTL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, task, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, task, value, now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached response and reset the counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Report cache effectiveness
+
+        Returns:
+            dict: hits, misses, hit_rate and current entry count
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+        }
+
+
+# Process-wide cache shared by every session
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Lazy initialization of the shared response cache"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,111 @@
+"""
+Retrieval Module
+In-memory BM25 index for selecting the report chunks relevant to a question
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+
+from chunking import split_markdown
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how in is it its of on or that the
+their this to was were what when where which who why will with about does do can
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def content_hash(text):
+    """Stable hash used to tell whether an index is still current"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """Okapi BM25 ranking over a fixed list of text chunks"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(chunks)) if chunks else 0.0
+
+        doc_freqs = Counter()
+        for tf in self._term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(chunks)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    @classmethod
+    def from_markdown(cls, text, chunk_chars=1500):
+        """
+        Build an index over Markdown split on section boundaries
+
+        Args:
+            text (str): Markdown content
+            chunk_chars (int): Maximum chunk size in characters
+
+        Returns:
+            BM25Index: Index over the chunks
+        """
+        return cls(split_markdown(text, chunk_chars))
+
+    def score(self, query):
+        """
+        Score every chunk against a query
+
+        Args:
+            query (str): Search text
+
+        Returns:
+            list: BM25 score per chunk
+        """
+        terms = tokenize(query)
+        scores = []
+        for tf, length in zip(self._term_freqs, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length) if self._avg_length else self.k1
+            total = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    total += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(total)
+        return scores
+
+    def ranked(self, query, k=4):
+        """
+        Return the indices of the top-k chunks for a query, best first
+
+        Args:
+            query (str): Search text
+            k (int): Number of chunks to return
+
+        Returns:
+            list: Chunk indices
+        """
+        scores = self.score(query)
+        return sorted(range(len(self.chunks)), key=lambda i: scores[i], reverse=True)[:k]
+
+    def search(self, query, k=4):
+        """
+        Return the top-k chunks for a query, in document order
+
+        Args:
+            query (str): Search text
+            k (int): Number of chunks to return
+
+        Returns:
+            list: Chunk strings
+        """
+        return [self.chunks[i] for i in sorted(self.ranked(query, k))]
@@ -0,0 +1,45 @@
+"""
+Simple test script for the HTTP API, against a fake model and a stub web search
+"""
+from fastapi.testclient import TestClient
+from fake_llm import FakeChatModel, LatencyProfile
+import api_server
+import news_pipeline
+
+PROFILE = LatencyProfile(ttft=0, tokens_per_second=100000, output_tokens=120)
+
+SEARCH_RESULTS = "\n".join(
+    f"{i}. Story {i}\n   URL: https://news{i}.example.com/story\n   Summary: Snippet about story {i}"
+    for i in range(1, 4)
+)
+
+
+async def stub_call_tool(name, arguments):
+    if name == 'search':
+        return SEARCH_RESULTS
+    return f"<html><body><p>{'Full article text for ' + arguments['url'] + '. ' * 3}</p></body></html>"
+
+
+def test_grounded_news_stream_matches_response():
+    previous = news_pipeline._default_call_tool
+    news_pipeline._default_call_tool = lambda: stub_call_tool
+    try:
+        # A fresh model per request, so both requests draw the same deterministic answer
+        client = TestClient(api_server.create_app(llm_provider=lambda key: FakeChatModel(profile=PROFILE)))
+        request = {'topic': "solar power", 'grounded': True, 'use_cache': False}
+        whole = client.post("/news", json=request)
+        streamed = client.post("/news", json={**request, 'stream': True})
+    finally:
+        news_pipeline._default_call_tool = previous
+    assert whole.status_code == 200 and streamed.status_code == 200
+    news = whole.json()['news']
+    assert "### Sources" in news and "Searching the web" not in news
+    # Joined deltas carry the digest from its first character, then the sources list
+    assert streamed.text == news
+
+
+if __name__ == "__main__":
+    print("🧪 Testing HTTP API\n")
+    for test in (test_grounded_news_stream_matches_response,):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,72 @@
+"""
+Simple test script for the plan-and-execute MCP mode, against stub tools and a scripted model
+"""
+import asyncio
+import json
+import time
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.tools import StructuredTool
+from mcp_planner import plan_and_execute
+
+TOOL_LATENCY = 0.2
+
+
+def stub_tools(log):
+    """search and fetch_content tools that sleep like a remote MCP server"""
+    async def search(query: str) -> str:
+        """Search the web"""
+        log.append(('search', query))
+        await asyncio.sleep(TOOL_LATENCY)
+        return f"Results for {query}: https://example.com/{query}"
+
+    async def fetch_content(url: str) -> str:
+        """Fetch a page"""
+        log.append(('fetch_content', url))
+        await asyncio.sleep(TOOL_LATENCY)
+        return f"Content of {url}"
+
+    return [
+        StructuredTool.from_function(coroutine=search, name='search'),
+        StructuredTool.from_function(coroutine=fetch_content, name='fetch_content'),
+    ]
+
+
+def plan(*calls):
+    return json.dumps({'calls': [{'tool': tool, 'arguments': arguments} for tool, arguments in calls]})
+
+
+def test_rounds_run_concurrently():
+    topics = [f"topic{i}" for i in range(5)]
+    llm = FakeListChatModel(responses=[
+        plan(*[('search', {'query': topic}) for topic in topics]),
+        plan(*[('fetch_content', {'url': f"https://example.com/{topic}"}) for topic in topics]),
+        "Final answer citing https://example.com/topic0",
+    ])
+    log = []
+    start = time.perf_counter()
+    answer = asyncio.run(plan_and_execute(llm, stub_tools(log), "What is new?", max_concurrency=5))
+    elapsed = time.perf_counter() - start
+    assert answer == "Final answer citing https://example.com/topic0"
+    assert [tool for tool, _ in log] == ['search'] * 5 + ['fetch_content'] * 5
+    # Two concurrent rounds; one call after another would take 10 tool latencies
+    assert elapsed < TOOL_LATENCY * 5, elapsed
+
+
+def test_repeated_and_unknown_calls():
+    llm = FakeListChatModel(responses=[
+        plan(('search', {'query': 'a'}), ('search', {'query': 'a'}), ('translate', {'text': 'a'})),
+        plan(('search', {'query': 'a'})),
+        "Answer",
+    ])
+    log = []
+    answer = asyncio.run(plan_and_execute(llm, stub_tools(log), "Question"))
+    assert answer == "Answer"
+    # The duplicate runs once and the repeat in round two ends planning
+    assert log == [('search', 'a')]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing MCP Plan-and-Execute\n")
+    for test in (test_rounds_run_concurrently, test_repeated_and_unknown_calls):
+        test()
+        print(f"✅ PASS - {test.__name__}")
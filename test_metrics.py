@@ -0,0 +1,33 @@
+"""
+Simple test script for metric percentiles
+"""
+from fractions import Fraction
+import math
+from metrics import percentile
+
+
+def test_nearest_rank_percentile():
+    assert percentile([], 95) is None
+    assert percentile([7], 50) == 7
+    assert percentile([1, 2], 50) == 1
+    assert percentile([2, 1], 51) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile(list(range(1, 101)), 100) == 100
+    assert percentile([1, 2, 3, 4], 0) == 1
+    assert percentile(list(range(1, 101)), 7) == 7
+    assert percentile([1, 2, 3], 150) == 3
+
+
+def test_every_integer_rank_is_exact():
+    for n in range(1, 201):
+        values = list(range(1, n + 1))
+        for pct in range(0, 101):
+            assert percentile(values, pct) == max(1, math.ceil(Fraction(pct * n, 100))), (pct, n)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Metric Percentiles\n")
+    for test in (test_nearest_rank_percentile, test_every_integer_rank_is_exact):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,51 @@
+"""
+Simple test script for the per-key token-bucket limiter
+"""
+import asyncio
+from langchain_core.messages import HumanMessage
+from fake_llm import FakeChatModel, LatencyProfile
+from rate_limiter import TokenBucketLimiter
+
+PROFILE = LatencyProfile(ttft=0.3, ttft_jitter=0.01, tokens_per_second=5000, output_tokens=50)
+
+
+def limited_model(tokens_per_minute):
+    limiter = TokenBucketLimiter(requests_per_minute=6000, tokens_per_minute=tokens_per_minute, burst=100)
+    model = FakeChatModel(profile=PROFILE, rate_limiter=limiter, callbacks=[limiter.usage_handler], max_tokens=1000)
+    return model, limiter
+
+
+def test_concurrent_calls_reserve_tokens():
+    # Each call reserves its prompt plus a 1000-token output limit, so 6000 TPM admits five at once
+    model, limiter = limited_model(6000)
+
+    async def main():
+        calls = [asyncio.ensure_future(model.ainvoke([HumanMessage(content=f"question {i} " * 20)]))
+                 for i in range(8)]
+        await asyncio.sleep(0.15)
+        in_flight = len(limiter._reserved)
+        await asyncio.gather(*calls)
+        return in_flight
+
+    assert asyncio.run(main()) == 5
+    # Reservations are settled with actual usage, returning the unused output allowance
+    assert not limiter._reserved
+    assert limiter._tokens > 4000
+
+
+def test_failed_call_refunds_reservation():
+    model, limiter = limited_model(6000)
+    model.profile = LatencyProfile(ttft=0, error_rate=1.0)
+    try:
+        model.invoke([HumanMessage(content="question")])
+    except Exception:
+        pass
+    assert not limiter._reserved
+    assert limiter._tokens > 5900
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Rate Limiter\n")
+    for test in (test_concurrent_calls_reserve_tokens, test_failed_call_refunds_reservation):
+        test()
+        print(f"✅ PASS - {test.__name__}")
@@ -0,0 +1,32 @@
+"""
+Simple test script for Q&A retrieval ranking
+"""
+from retrieval import BM25Index
+import research
+
+
+def filler_section(title, words=1200):
+    return f"## {title}\n\n" + " ".join(f"filler{i % 50}" for i in range(words))
+
+
+def test_ranked_scores_short_reports():
+    index = BM25Index(["## Intro\n\nGeneral text", "## Costs\n\nBattery costs fell", "## Outlook\n\nMore text"])
+    # Fewer chunks than k are still returned best first
+    assert index.ranked("battery costs", k=4)[0] == 1
+
+
+def test_qna_keeps_relevant_last_chunk():
+    chunks = [filler_section("Background"), filler_section("Market"),
+              filler_section("Storage") + " lithium battery storage capacity doubled"]
+    index = BM25Index(chunks)
+    # Each chunk takes most of the Q&A budget, so only one fits
+    context = research._qna_inputs(index, "How much did lithium battery storage capacity grow?")['context']
+    assert "## Storage" in context
+    assert "## Background" not in context and "## Market" not in context
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Q&A Retrieval\n")
+    for test in (test_ranked_scores_short_reports, test_qna_keeps_relevant_last_chunk):
+        test()
+        print(f"✅ PASS - {test.__name__}")
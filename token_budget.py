@@ -0,0 +1,165 @@
+"""
+Token Budget Module
+Prompt token estimates, per-task input and output budgets, context packing and usage logging
+"""
+from langchain_core.callbacks import BaseCallbackHandler
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Input budget (prompt tokens, template included) and output limit per task
+TASK_BUDGETS = {
+    'report': {'input': 1000, 'output': 2048},
+    'news': {'input': 6000, 'output': 1536},
+    'summary': {'input': 8000, 'output': 1024},
+    'summary_map': {'input': 2500, 'output': 512},
+    'qna': {'input': 3000, 'output': 1024},
+    'feedback': {'input': 800, 'output': 256},
+    'mcp_memory': {'input': 3000, 'output': 300},
+    'mcp_plan': {'input': 6000, 'output': 512},
+    'mcp_answer': {'input': 8000, 'output': 1536},
+}
+DEFAULT_BUDGET = {'input': 4000, 'output': 1024}
+
+# English prose averages about four characters per token
+CHARS_PER_TOKEN = 4
+
+_BOUNDARY = re.compile(r"(\n\n|\n|(?<=[.!?])\s)")
+
+
+def estimate_tokens(text):
+    """Rough token count of a text, without calling the model"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def budget_for(task):
+    """Input and output token budget for a task"""
+    return TASK_BUDGETS.get(task, DEFAULT_BUDGET)
+
+
+def truncate(text, max_tokens):
+    """
+    Shorten text to a token budget, cutting at a paragraph or sentence boundary when one is near
+
+    Args:
+        text (str): Text to shorten
+        max_tokens (int): Token budget
+
+    Returns:
+        str: The text, unchanged if it fits
+    """
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundaries = [m.end() for m in _BOUNDARY.finditer(cut)]
+    # Only back off to a boundary within the last fifth, so little content is lost
+    if boundaries and boundaries[-1] >= max_chars * 0.8:
+        cut = cut[:boundaries[-1]]
+    return cut.rstrip() + " …"
+
+
+def pack(items, max_tokens, text=lambda item: item):
+    """
+    Select items that fit a token budget, dropping the lowest-priority ones first
+
+    Args:
+        items (list): Items in priority order, most important first
+        max_tokens (int): Token budget for all selected items together
+        text (callable): Returns an item's text
+
+    Returns:
+        list: Selected items in priority order; if even the first item is too
+            large, it alone is returned and the caller should truncate it
+    """
+    selected = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(text(item))
+        if used + cost <= max_tokens:
+            selected.append(item)
+            used += cost
+    if not selected and items:
+        selected.append(items[0])
+    return selected
+
+
+def limit_output(llm, task):
+    """Bind a task's output token limit to a chat model"""
+    return llm.bind(max_output_tokens=budget_for(task)['output'])
+
+
+def prompt_tokens(chain, inputs):
+    """
+    Estimate the prompt size of a `prompt | llm | parser` chain for given inputs
+
+    Returns:
+        int: Estimated tokens, or 0 when the chain has no prompt template
+    """
+    steps = getattr(chain, 'steps', [chain])
+    prompt = next((step for step in steps if hasattr(step, 'format') and hasattr(step, 'template')), None)
+    if prompt is None:
+        return 0
+    try:
+        return estimate_tokens(prompt.format(**inputs))
+    except (KeyError, ValueError):
+        return 0
+
+
+class UsageRecorder(BaseCallbackHandler):
+    """Collects the provider-reported token usage of the model calls in one chain run"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if usage:
+                    self.input_tokens += usage.get('input_tokens', 0)
+                    self.output_tokens += usage.get('output_tokens', 0)
+
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def record_usage(task, predicted, recorder):
+    """
+    Log predicted against actual prompt tokens and keep running totals per task
+
+    Args:
+        task (str): Task name
+        predicted (int): Estimated prompt tokens
+        recorder (UsageRecorder): Usage reported by the provider
+
+    Returns:
+        dict: predicted_input, input and output token counts for this call
+    """
+    tokens = {'predicted_input': predicted, 'input': recorder.input_tokens, 'output': recorder.output_tokens}
+    if recorder.input_tokens:
+        logger.info("%s: predicted %d prompt tokens, actual %d (output %d)",
+                    task, predicted, recorder.input_tokens, recorder.output_tokens)
+    with _usage_lock:
+        totals = _usage.setdefault(task, {'calls': 0, 'predicted_input': 0, 'input': 0, 'output': 0})
+        totals['calls'] += 1
+        for name, value in tokens.items():
+            totals[name] += value
+    return tokens
+
+
+def usage_stats():
+    """
+    Running token totals per task
+
+    Returns:
+        dict: Per task, calls, predicted_input, input and output tokens
+    """
+    with _usage_lock:
+        return {task: dict(totals) for task, totals in _usage.items()}
@@ -0,0 +1,194 @@
+"""
+Tool Cache Module
+In-memory cache for MCP tool calls with per-tool TTLs and in-flight request coalescing
+"""
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Time-to-live per tool, in seconds. Only read-only tools are listed; anything
+# else (e.g. browser navigation and clicks) has side effects and is never cached.
+TOOL_TTLS = {
+    # duckduckgo-search
+    'search': 1800,
+    'fetch_content': 6 * 3600,
+    # bright_data
+    'search_engine': 1800,
+    'scrape_as_markdown': 6 * 3600,
+    'scrape_as_html': 6 * 3600,
+}
+
+MCP_TOOL_CACHE_MAX_ENTRIES = int(os.getenv("MCP_TOOL_CACHE_MAX_ENTRIES", "1000"))
+
+# Query parameters that only track where a link was shared from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'ref', 'ref_src'}
+
+
+def normalize_url(url):
+    """Lowercase scheme and host, drop fragments, tracking parameters and trailing slashes"""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not (k.lower().startswith('utm_') or k.lower() in TRACKING_PARAMS)]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def normalize_arguments(arguments):
+    """
+    Normalize tool arguments so equivalent calls share a cache key
+
+    Args:
+        arguments (dict): Tool call arguments
+
+    Returns:
+        dict: Arguments with URLs canonicalized and other strings whitespace- and case-folded
+    """
+    normalized = {}
+    for name, value in (arguments or {}).items():
+        if isinstance(value, str):
+            if value.strip().lower().startswith(('http://', 'https://')):
+                value = normalize_url(value)
+            else:
+                value = " ".join(value.split()).casefold()
+        normalized[name] = value
+    return normalized
+
+
+def make_key(tool, arguments):
+    """Cache key from the tool name and normalized arguments"""
+    payload = json.dumps({'tool': tool, 'arguments': normalize_arguments(arguments)},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolCallCache:
+    """
+    Process-wide cache of MCP tool results
+
+    Concurrent identical calls are coalesced: the first caller runs the tool
+    and the others await its result. All calls are expected to come from the
+    MCP pool's event loop.
+    """
+
+    def __init__(self, ttls=TOOL_TTLS, max_entries=MCP_TOOL_CACHE_MAX_ENTRIES):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def ttl_for(self, tool):
+        return self.ttls.get(tool, 0)
+
+    def _count(self, tool, outcome):
+        with self._lock:
+            counts = self._stats.setdefault(tool, {'hits': 0, 'misses': 0, 'coalesced': 0})
+            counts[outcome] += 1
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires_at'] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = {'value': value, 'expires_at': time.time() + ttl}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def call(self, tool, arguments, fetch, cacheable=lambda value: True):
+        """
+        Return a cached result for a tool call, or run it once for all concurrent callers
+
+        Args:
+            tool (str): Tool name
+            arguments (dict): Tool arguments
+            fetch (callable): Coroutine function that performs the real call
+            cacheable (callable): Decides whether a result may be stored, e.g. not errors
+
+        Returns:
+            The tool result
+        """
+        ttl = self.ttl_for(tool)
+        if ttl <= 0:
+            return await fetch()
+
+        key = make_key(tool, arguments)
+        entry = self._lookup(key)
+        if entry is not None:
+            self._count(tool, 'hits')
+            return entry['value']
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._count(tool, 'coalesced')
+            return await asyncio.shield(pending)
+
+        self._count(tool, 'misses')
+        pending = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = pending
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark retrieved so failures nobody waited on are not logged
+            pending.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+        if cacheable(value):
+            self._store(key, value, ttl)
+        pending.set_result(value)
+        return value
+
+    def clear(self):
+        """Remove every cached result"""
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Hit statistics overall and per tool
+
+        Returns:
+            dict: hits, misses, coalesced, hit_rate (hits and coalesced calls over all calls),
+                entries and per-tool counts under 'tools'
+        """
+        with self._lock:
+            tools = {tool: dict(counts) for tool, counts in self._stats.items()}
+        totals = {'hits': 0, 'misses': 0, 'coalesced': 0}
+        for counts in tools.values():
+            for outcome in totals:
+                totals[outcome] += counts[outcome]
+        calls = sum(totals.values())
+        totals['hit_rate'] = (totals['hits'] + totals['coalesced']) / calls if calls else 0.0
+        totals['entries'] = len(self._entries)
+        totals['tools'] = tools
+        return totals
+
+
+_tool_cache = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache():
+    """Get the process-wide tool call cache"""
+    global _tool_cache
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                _tool_cache = ToolCallCache()
+    return _tool_cache
@@ -0,0 +1,203 @@
+"""
+Warm-up Module
+Pre-imports the research stack, builds chains and opens connections ahead of the first request,
+so a fresh process serves its first user at full speed
+
+Readiness probes call it through GET /ready on the HTTP API; the Streamlit app starts it in the
+background while the API key screen is shown, then warms the entered key's chains and starts the MCP
+agent pool once a key is active.
+
+Usage:
+    python warmup.py
+"""
+import hashlib
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Also pre-start the MCP agent pool when mcp-use is installed
+WARMUP_MCP = bool(int(os.getenv("WARMUP_MCP", "1")))
+
+WARMUP_MODULES = (
+    "langchain_google_genai", "llm", "rate_limiter", "metrics", "cassette",
+    "research", "feedback", "news_pipeline", "response_cache", "tool_cache", "jobs",
+)
+
+COLD = 'cold'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class WarmUp:
+    """
+    One-time, process-wide warm-up run on a background thread
+
+    Steps after the imports are best effort: a step that fails is reported
+    but does not keep the process from becoming ready.
+    """
+
+    def __init__(self):
+        self.state = COLD
+        self.steps = {}
+        self.error = None
+        self._thread = None
+        self._mcp_started = False
+        self._warmed_keys = set()
+        self._lock = threading.Lock()
+
+    def start(self, api_key=None, mcp=WARMUP_MCP):
+        """Start warming up in the background unless already started; returns self"""
+        with self._lock:
+            if self._thread is None:
+                self.state = WARMING
+                self._thread = threading.Thread(target=self.run, args=(api_key, mcp), name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _claim_mcp(self):
+        """Whether the caller should start the MCP pool: enabled, installed and not started yet"""
+        with self._lock:
+            if self._mcp_started or not WARMUP_MCP or importlib.util.find_spec("mcp_use") is None:
+                return False
+            self._mcp_started = True
+            return True
+
+    def start_for_key(self, api_key):
+        """
+        Warm up for a key entered after start: build its chains, then start the MCP
+        agent pool unless disabled or already started. Runs in the background, once per key.
+
+        Returns:
+            WarmUp: self
+        """
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest in self._warmed_keys:
+                return self
+            self._warmed_keys.add(digest)
+
+        def run():
+            self._step('chains', lambda: warm_chains(api_key))
+            if self._claim_mcp():
+                self._step('mcp_pool', warm_mcp_pool)
+
+        threading.Thread(target=run, name="warmup-key", daemon=True).start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until the warm-up finishes; returns whether it is ready"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == READY
+
+    def _step(self, name, fn):
+        start = time.perf_counter()
+        try:
+            detail = fn()
+            self.steps[name] = {'seconds': round(time.perf_counter() - start, 3), 'detail': detail}
+        except Exception as e:
+            self.steps[name] = {'seconds': round(time.perf_counter() - start, 3), 'error': f"{type(e).__name__}: {e}"}
+            logger.warning("Warm-up step %s failed: %s", name, e)
+
+    def run(self, api_key=None, mcp=WARMUP_MCP):
+        """Run every warm-up step in the calling thread"""
+        self.state = WARMING
+        start = time.perf_counter()
+        try:
+            for module in WARMUP_MODULES:
+                importlib.import_module(module)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = FAILED
+            logger.error("Warm-up import failed: %s", e)
+            return
+        self.steps['imports'] = {'seconds': round(time.perf_counter() - start, 3)}
+        self._step('chains', lambda: warm_chains(api_key))
+        self._step('response_cache', warm_response_cache)
+        if mcp and self._claim_mcp():
+            self._step('mcp_pool', warm_mcp_pool)
+        self.steps['total'] = {'seconds': round(time.perf_counter() - start, 3)}
+        self.state = READY
+
+    def status(self):
+        """
+        Progress for readiness probes
+
+        Returns:
+            dict: 'state' (cold, warming, ready or failed), per-step timings and any error
+        """
+        return {'state': self.state, 'steps': dict(self.steps), 'error': self.error}
+
+
+def warm_chains(api_key=None):
+    """
+    Build a client and every research and feedback chain
+
+    With a key (argument, secrets or environment) the chains are kept in the
+    registry for that key. Without one there is nothing to keep them for, so
+    the step stops after the imports and says so.
+    """
+    import feedback
+    import llm
+    import research
+
+    try:
+        client = llm.get_llm(api_key, temperature=0.7, max_tokens=2048)
+    except ValueError:
+        return 'imports only (no API key)'
+    for task in research.CHAIN_BUILDERS:
+        research.get_task_chain(client, task)
+    feedback.get_chains(client)
+    return 'registered client'
+
+
+def warm_response_cache():
+    """Open the response cache database"""
+    from response_cache import get_response_cache
+    return f"{get_response_cache().stats()['entries']} entries"
+
+
+def warm_mcp_pool():
+    """Start the pooled MCP agents in the background"""
+    import get_mcp
+    get_mcp.warm_up()
+    return 'started'
+
+
+_warm_up = WarmUp()
+
+
+def start(api_key=None, mcp=WARMUP_MCP):
+    """Start the process-wide warm-up in the background, once"""
+    return _warm_up.start(api_key, mcp)
+
+
+def start_for_key(api_key):
+    """Warm a key's chains and the MCP agent pool in the background, e.g. after an API key is entered"""
+    return _warm_up.start_for_key(api_key)
+
+
+def status():
+    """Progress of the process-wide warm-up"""
+    return _warm_up.status()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    warm_up = start()
+    warm_up.wait()
+    for name, step in warm_up.status()['steps'].items():
+        print(f"   {name:<15} {step['seconds']:.3f}s {step.get('error') or step.get('detail') or ''}")
+    print(f"{'✅' if warm_up.state == READY else '❌'} Warm-up {warm_up.state}")
+    return 0 if warm_up.state == READY else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())